@@ -0,0 +1,76 @@
+"""Сравнение потокового парсера лент с прежним разбором через BeautifulSoup.
+
+Запуск: python benchmarks/bench_feed_parser.py [--items 50 500 2000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RSS_ITEMS_LIMIT
+from feed_parser import parse_feed, parse_feed_soup
+
+
+def build_feed(items, encoding='utf-8'):
+    """Синтетическая RSS-лента из items элементов"""
+    parts = [
+        f'<?xml version="1.0" encoding="{encoding}"?>\n'
+        '<rss version="2.0"><channel><title>Синтетическая лента</title>'
+    ]
+    for i in range(items):
+        parts.append(
+            f'<item><title>Новость {i}: изменения в правилах ОСАГО</title>'
+            f'<link>https://example.ru/news/{i}</link>'
+            f'<description><![CDATA[<p>{"Страховая компания повысила тарифы по полисам КАСКО. " * 8}</p>]]></description>'
+            f'<pubDate>Mon, 15 Jan 2024 10:{i % 60:02d}:00 +0300</pubDate>'
+            f'<guid>https://example.ru/news/{i}</guid></item>'
+        )
+    parts.append('</channel></rss>')
+    return ''.join(parts).encode(encoding)
+
+
+def measure(func, repeat):
+    """Лучшее время из repeat запусков, мс"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, nargs='+', default=[50, 500, 2000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'лента':<22}{'размер, КБ':>12}{'stream, мс':>14}{'soup, мс':>12}{'ускорение':>12}")
+    for items in args.items:
+        for encoding in ('utf-8', 'windows-1251'):
+            data = build_feed(items, encoding)
+            stream_ms = measure(lambda: parse_feed(data, 'bench', RSS_ITEMS_LIMIT), args.repeat)
+
+            try:
+                # Прежний путь: response.text() + полное дерево BeautifulSoup
+                soup_ms = measure(
+                    lambda: parse_feed_soup(data.decode(encoding), 'bench', RSS_ITEMS_LIMIT),
+                    args.repeat
+                )
+                soup_text = f"{soup_ms:>12.2f}"
+                speedup = f"{soup_ms / stream_ms:>11.1f}x"
+            except Exception as e:
+                # Для 'xml' BeautifulSoup требуется lxml
+                soup_text = f"{'—':>12}"
+                speedup = f"{'—':>12}"
+                print(f"⚠️ Разбор через BeautifulSoup недоступен: {e}", file=sys.stderr)
+
+            name = f"{items} items {encoding}"
+            print(f"{name:<22}{len(data) / 1024:>12.1f}{stream_ms:>14.2f}{soup_text}{speedup}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Офлайн-бенчмарк конвейера: сбор -> проверка -> выбор -> дедупликация.
+
+Источники обслуживает локальный SyntheticServer, сеть не нужна.
+Запуск:
+    python benchmarks/bench_pipeline.py --sources 10 100 1000
+    python benchmarks/bench_pipeline.py --save-baseline    # записать benchmarks/baseline.json
+Без --save-baseline результаты сравниваются с базовой линией, регрессии дают код выхода 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import content_aggregator
+import source_health
+from content_aggregator import ContentAggregator
+from content_verifier import ContentVerifier
+from database import Database
+from synthetic_server import SyntheticServer
+
+CONTENT_TYPE = 'insurance'
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+def percentile(values, pct):
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class Stage:
+    """Замеры одного этапа: задержки единиц работы, общее время и пик памяти"""
+    
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.latencies = []
+        self.units = 0
+        self.elapsed = 0.0
+        self.peak_memory = 0
+        
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+        
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        self.peak_memory = tracemalloc.get_traced_memory()[1] - self.start_memory
+        
+    def result(self):
+        return {
+            'unit': self.unit,
+            'units': self.units,
+            'throughput': self.units / self.elapsed if self.elapsed else 0.0,
+            'p50_ms': percentile(self.latencies, 50) * 1000,
+            'p95_ms': percentile(self.latencies, 95) * 1000,
+            'p99_ms': percentile(self.latencies, 99) * 1000,
+            'peak_memory_kb': self.peak_memory / 1024,
+        }
+
+class InstrumentedAggregator(ContentAggregator):
+    """Агрегатор, который запоминает время запроса и разбора каждого источника (без ожидания в очереди)
+    и исключения источников: агрегатор их только логирует, а замер без части источников недействителен"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+        self.errors = []
+        
+    async def timed(self, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            
+    async def fetch_rss(self, *args, **kwargs):
+        return await self.timed(super().fetch_rss(*args, **kwargs))
+        
+    async def fetch_web_content(self, *args, **kwargs):
+        return await self.timed(super().fetch_web_content(*args, **kwargs))
+        
+    async def fetch_source(self, source, *args, **kwargs):
+        try:
+            return await super().fetch_source(source, *args, **kwargs)
+        except Exception as e:
+            self.errors.append((source, e))
+            raise
+
+async def run_once(server, count, args):
+    urls = server.mix(count, slow_delay=args.slow_delay)
+    config.SOURCES[CONTENT_TYPE] = urls
+    results = {}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        aggregator = InstrumentedAggregator(db)
+        verifier = ContentVerifier()
+        try:
+            with Stage('fetch', 'source') as stage:
+                posts = await aggregator.fetch_content(CONTENT_TYPE)
+            if aggregator.errors:
+                source, error = aggregator.errors[0]
+                raise RuntimeError(f"{len(aggregator.errors)} из {len(urls)} источников завершились исключением, "
+                                   f"первое - {source}: {error!r}")
+            stage.latencies = aggregator.latencies
+            stage.units = len(urls)
+            results['fetch'] = stage.result()
+            
+            with Stage('verify', 'post') as stage:
+                verified = await verifier.verify_content(posts, CONTENT_TYPE)
+            # Задержка на один пост - отдельными вызовами по выборке
+            for post in posts[:args.sample]:
+                start = time.perf_counter()
+                await verifier.verify_content([post], CONTENT_TYPE)
+                stage.latencies.append(time.perf_counter() - start)
+            stage.units = len(posts)
+            results['verify'] = stage.result()
+            
+            with Stage('select', 'call') as stage:
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    if verified:
+                        verifier.select_best_post(verified)
+                    stage.latencies.append(time.perf_counter() - start)
+            stage.units = args.repeat
+            results['select'] = stage.result()
+            
+            # Половина кандидатов уже "опубликована" - подготовка, в замер не входит
+            for post in verified[::2]:
+                await db.save_post(post, CONTENT_TYPE)
+                
+            with Stage('dedup', 'post') as stage:
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    unposted = await db.filter_unposted(verified)
+                    await db.filter_near_duplicates(unposted)
+                    stage.latencies.append((time.perf_counter() - start) / max(len(verified), 1))
+            stage.units = len(verified) * args.repeat
+            results['dedup'] = stage.result()
+        finally:
+            await aggregator.close()
+            db.close()
+            
+    return results
+
+def print_results(count, results):
+    print(f"\n=== {count} источников ===")
+    print(f"{'этап':<8}{'ед.':>8}{'кол-во':>9}{'ед./с':>12}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'пик, КБ':>11}")
+    for name, stage in results.items():
+        print(f"{name:<8}{stage['unit']:>8}{stage['units']:>9}{stage['throughput']:>12.1f}"
+              f"{stage['p50_ms']:>10.2f}{stage['p95_ms']:>10.2f}{stage['p99_ms']:>10.2f}"
+              f"{stage['peak_memory_kb']:>11.0f}")
+
+def compare(report, baseline, tolerance):
+    """Регрессии относительно базовой линии: рост p95 или падение пропускной способности"""
+    regressions = []
+    for count, stages in report.items():
+        for name, stage in stages.items():
+            base = baseline.get(count, {}).get(name)
+            if not base:
+                continue
+            if base['p95_ms'] and stage['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{count}/{name}: p95 {base['p95_ms']:.2f} -> {stage['p95_ms']:.2f} мс")
+            if base['throughput'] and stage['throughput'] < base['throughput'] * (1 - tolerance):
+                regressions.append(f"{count}/{name}: {base['throughput']:.1f} -> {stage['throughput']:.1f} ед./с")
+    return regressions
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sources', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--timeout', type=float, default=2.0, help='таймаут запроса к источнику, с')
+    parser.add_argument('--concurrency', type=int, default=config.HTTP_MAX_CONCURRENCY,
+                        help='одновременных запросов к источникам')
+    parser.add_argument('--slow-delay', type=float, default=0.5, help='задержка медленных источников, с')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--sample', type=int, default=200, help='постов для замера задержки проверки')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое ухудшение, доля')
+    args = parser.parse_args()
+    
+    # Только локальные источники: общие ленты отключаются, таймаут сокращается
+    saved_sources = config.SOURCES.get(CONTENT_TYPE)
+    saved_shared = list(config.SHARED_SOURCES)
+    config.SHARED_SOURCES.clear()
+    content_aggregator.HTTP_TIMEOUT = args.timeout
+    source_health.HTTP_TIMEOUT = args.timeout
+    content_aggregator.HTTP_MAX_CONCURRENCY = args.concurrency
+    # Все синтетические источники живут на одном хосте, поэтому по-хостовый лимит равен общему
+    content_aggregator.HTTP_PER_HOST_CONCURRENCY = args.concurrency
+    
+    server = await SyntheticServer().start()
+    tracemalloc.start()
+    report = {}
+    try:
+        for count in args.sources:
+            report[str(count)] = await run_once(server, count, args)
+            print_results(count, report[str(count)])
+    finally:
+        tracemalloc.stop()
+        await server.stop()
+        config.SOURCES[CONTENT_TYPE] = saved_sources
+        config.SHARED_SOURCES.extend(saved_shared)
+        
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Базовая линия сохранена в {args.baseline}")
+        return 0
+        
+    if not os.path.exists(args.baseline):
+        print("\nℹ️ Базовой линии нет, запустите с --save-baseline")
+        return 0
+        
+    with open(args.baseline, encoding='utf-8') as f:
+        regressions = compare(report, json.load(f), args.tolerance)
+    if regressions:
+        print("\n❌ Регрессии относительно базовой линии:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\n✅ Регрессий нет")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
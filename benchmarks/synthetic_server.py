@@ -0,0 +1,143 @@
+"""Локальный HTTP-сервер синтетических RSS/Atom-лент и HTML-страниц для бенчмарков.
+
+Поведение задается параметрами запроса, поэтому любой URL самодостаточен:
+    /<домен>/rss/<n>.xml?kind=rss&items=50&encoding=windows-1251&delay=0.2
+    kind: rss | atom | html | hang | 404
+"""
+import asyncio
+import hashlib
+from aiohttp import web
+
+# Домены из списка доверенных в ContentVerifier.verify_source, чтобы посты проходили проверку
+TRUSTED_DOMAINS = ['drom.ru', 'fishki.net', 'banki.ru', 'garant.ru', 'consultant.ru', 'insur-info.ru']
+
+TITLES = [
+    'ЦБ изменил тарифный коридор ОСАГО',
+    'Страховая компания повысила цены на полисы КАСКО',
+    'КБМ для водителей пересчитают с апреля',
+    'Автострахование: что изменилось для владельцев машин',
+    'Страхование ответственности подорожает в регионах',
+]
+PARAGRAPH = ('Страховые компании сообщили об изменении правил расчета стоимости полиса. '
+             'Эксперты рынка объясняют, как новые тарифы повлияют на водителей и что проверить '
+             'при продлении договора страхования. ')
+
+def build_items(items, source_id):
+    for i in range(items):
+        yield (
+            f"{TITLES[(i + source_id) % len(TITLES)]} ({source_id}-{i})",
+            f"https://example.ru/{source_id}/news/{i}",
+            PARAGRAPH * (1 + i % 4),
+            f"Mon, 15 Jan 2024 {i % 24:02d}:{(i * 7) % 60:02d}:00 +0300"
+        )
+
+def build_rss(items, source_id, encoding):
+    parts = [f'<?xml version="1.0" encoding="{encoding}"?>\n<rss version="2.0"><channel>'
+             f'<title>Лента {source_id}</title>']
+    for title, link, text, date in build_items(items, source_id):
+        parts.append(f'<item><title>{title}</title><link>{link}</link>'
+                     f'<description><![CDATA[<p>{text}</p>]]></description>'
+                     f'<pubDate>{date}</pubDate><guid>{link}</guid></item>')
+    parts.append('</channel></rss>')
+    return ''.join(parts).encode(encoding)
+
+def build_atom(items, source_id, encoding):
+    parts = [f'<?xml version="1.0" encoding="{encoding}"?>\n'
+             f'<feed xmlns="http://www.w3.org/2005/Atom"><title>Лента {source_id}</title>']
+    for title, link, text, date in build_items(items, source_id):
+        parts.append(f'<entry><title>{title}</title><link href="{link}"/>'
+                     f'<summary>{text}</summary><published>{date}</published></entry>')
+    parts.append('</feed>')
+    return ''.join(parts).encode(encoding)
+
+def build_html(items, source_id, encoding):
+    # items задает "вес" страницы: количество блоков обвязки вокруг статьи
+    filler = '<div class="sidebar"><a href="#">Ссылка</a> ' + 'Реклама и навигация. ' * 20 + '</div>'
+    script = '<script>var data = "' + 'x' * 500 + '";</script>'
+    title, _, text, _ = next(build_items(1, source_id))
+    page = (f'<html><head><meta charset="{encoding}"><title>{title}</title>{script}</head><body>'
+            f'<nav>Меню сайта</nav>{filler * items}<article><h1>{title}</h1><p>{text * 3}</p></article>'
+            f'{filler * items}<footer>Подвал</footer></body></html>')
+    return page.encode(encoding)
+
+BUILDERS = {'rss': build_rss, 'atom': build_atom, 'html': build_html}
+CONTENT_TYPES = {'rss': 'application/rss+xml', 'atom': 'application/atom+xml', 'html': 'text/html'}
+
+class SyntheticServer:
+    """aiohttp-сервер на 127.0.0.1 со случайным портом"""
+    
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.runner = None
+        self.cache = {}
+        
+    async def handle(self, request):
+        kind = request.query.get('kind', 'rss')
+        items = int(request.query.get('items', 20))
+        encoding = request.query.get('encoding', 'utf-8')
+        delay = float(request.query.get('delay', 0))
+        source_id = int(request.query.get('id', 0))
+        
+        if kind == 'hang':
+            await asyncio.sleep(3600)
+        if delay:
+            await asyncio.sleep(delay)
+        if kind == '404' or kind not in BUILDERS:
+            raise web.HTTPNotFound()
+            
+        key = (kind, items, encoding, source_id)
+        if key not in self.cache:
+            self.cache[key] = BUILDERS[kind](items, source_id, encoding)
+        body = self.cache[key]
+        
+        # ETag позволяет проверить и путь условных запросов (304)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(
+            body=body,
+            headers={'ETag': etag, 'Content-Type': f'{CONTENT_TYPES[kind]}; charset={encoding}'}
+        )
+        
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port, shutdown_timeout=0.1)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        return self
+        
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            
+    def url(self, source_id, kind='rss', items=20, encoding='utf-8', delay=0):
+        """URL синтетического источника; путь содержит доверенный домен и признак ленты"""
+        domain = TRUSTED_DOMAINS[source_id % len(TRUSTED_DOMAINS)]
+        path = f'{domain}/rss/{source_id}.xml' if kind != 'html' else f'{domain}/news/{source_id}'
+        return (f'http://{self.host}:{self.port}/{path}?kind={kind}&items={items}'
+                f'&encoding={encoding}&delay={delay}&id={source_id}')
+                
+    def mix(self, count, slow_delay=0.5):
+        """Реалистичный набор источников: разные размеры и кодировки, медленные, зависшие и 404"""
+        urls = []
+        for i in range(count):
+            bucket = i % 50
+            if bucket < 30:
+                urls.append(self.url(i, 'rss', items=(20, 100, 500)[i % 3],
+                                     encoding='windows-1251' if i % 4 == 0 else 'utf-8'))
+            elif bucket < 37:
+                urls.append(self.url(i, 'atom', items=(20, 100)[i % 2]))
+            elif bucket < 43:
+                urls.append(self.url(i, 'html', items=(5, 50)[i % 2],
+                                     encoding='windows-1251' if i % 2 else 'utf-8'))
+            elif bucket < 47:
+                urls.append(self.url(i, 'rss', items=50, delay=slow_delay))
+            elif bucket < 49:
+                urls.append(self.url(i, '404'))
+            else:
+                urls.append(self.url(i, 'hang'))
+        return urls
@@ -3,6 +3,60 @@ import os
 # Настройки Telegram
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "your_bot_token_here")
 CHANNEL_ID = "@autoinsaider_1"
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")  # Адрес Bot API (без токена)
+
+# Лимиты Bot API: ~30 сообщений в секунду всего и ~20 в минуту в один канал
+TELEGRAM_GLOBAL_RATE = 30  # Сообщений в секунду на бота
+TELEGRAM_CHAT_RATE = 20 / 60  # Сообщений в секунду в один чат
+TELEGRAM_MAX_RETRIES = 5  # Попыток отправки одного сообщения
+TELEGRAM_RETRY_BASE_DELAY = 2  # Начальная пауза между попытками, секунд (удваивается)
+
+# Настройки HTTP-клиента
+HTTP_TIMEOUT = 15  # Таймаут запроса к источнику, секунд
+HTTP_MAX_CONCURRENCY = 10  # Одновременных запросов ко всем источникам
+HTTP_PER_HOST_CONCURRENCY = 2  # Одновременных запросов к одному хосту
+HTTP_DNS_CACHE_TTL = 300  # Время жизни DNS-кэша, секунд
+HTTP_KEEPALIVE_TIMEOUT = 30  # Время удержания keep-alive соединения, секунд
+
+# Здоровье источников: после HEALTH_FAILURE_THRESHOLD ошибок подряд источник отключается
+# на HEALTH_OPEN_SECONDS (пауза удваивается до HEALTH_OPEN_MAX_SECONDS), затем пробный запрос
+HEALTH_FAILURE_THRESHOLD = 3
+HEALTH_OPEN_SECONDS = 300
+HEALTH_OPEN_MAX_SECONDS = 6 * 3600
+HEALTH_EWMA_ALPHA = 0.3  # Вес нового замера в скользящих средних задержки и успешности
+HEALTH_TIMEOUT_FACTOR = 4  # Таймаут источника = средняя задержка * множитель ...
+HEALTH_MIN_TIMEOUT = 3  # ... но не меньше, секунд (и не больше HTTP_TIMEOUT)
+
+# Парсинг RSS: "stream" - потоковый парсер, "soup" - прежнее дерево BeautifulSoup
+RSS_PARSER = os.getenv("RSS_PARSER", "stream")
+RSS_ITEMS_LIMIT = 5  # Сколько последних постов берем из каждой ленты
+FEED_MAX_BYTES = 2 * 1024 * 1024  # Сколько байтов ленты читаем не больше при разборе в пуле
+
+# Разбор веб-страниц: "stream" - потоковый, только заголовок и статья, "soup" - прежнее дерево BeautifulSoup
+PAGE_PARSER = os.getenv("PAGE_PARSER", "stream")
+PAGE_MAX_BYTES = 512 * 1024  # Сколько байтов страницы читаем не больше
+
+# Пул для разбора лент/страниц и проверки постов: "thread", "process" или "none" (в event loop)
+PARSE_POOL = os.getenv("PARSE_POOL", "thread")
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Архив сырых ответов источников (сжатые тела по sha256 и журнал index.jsonl) для разбора
+# инцидентов и воспроизведения без сети: python main.py --replay <каталог>; пусто - не сохранять
+RAW_SNAPSHOT_DIR = os.getenv("RAW_SNAPSHOT_DIR", "")
+
+# Планировщик: расписание хранится в БД, запуск, пропущенный во время простоя, выполняется
+# после перезапуска, если опоздание не больше SCHEDULE_MISFIRE_GRACE секунд
+SCHEDULE_MISFIRE_GRACE = 6 * 3600
+SCHEDULE_MAX_SLEEP = 3600  # Планировщик сверяется с часами не реже, секунд
+
+# Быстрый старт (частые перезапуски на бесплатном плане Render): без проверки Telegram, тестовой
+# публикации и сбора при запуске; первый сбор и досылка очереди - через FAST_START_DELAY секунд
+FAST_START = os.getenv("FAST_START", "1") == "1"
+FAST_START_DELAY = 30
+
+# Метрики в формате Prometheus на локальном порту (/metrics, /runs); 0 - не запускать
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
 
 # Обновленные проверенные источники
 SOURCES = {
@@ -23,9 +77,81 @@ SOURCES = {
     ]
 }
 
+# Общие ленты: загружаются один раз и раскладываются по всем категориям по ключевым словам
+SHARED_SOURCES = [
+    "https://www.rbc.ru/rbcnews.xml",  # РБК
+    "https://rg.ru/rss/index.xml",  # Российская газета
+]
+FEED_SNAPSHOT_TTL = 600  # Сколько секунд снимок ленты считается свежим
+
+# Каналы: у каждого свое расписание категорий, при необходимости свои источники и оформление.
+# Все каналы обслуживаются одним процессом с общей загрузкой лент, проверкой и дедупликацией.
+#   "schedule" - список правил {"content_type": ..., "cron": параметры CronTrigger (время UTC)}
+#   "sources"  - необязательно: {категория: [url, ...]} вместо SOURCES для этого канала
+#   "format"   - необязательно: {"emoji": {...}, "titles": {...}, "footer": "..."} для TelegramPoster.format_post
+CHANNELS = [
+    {
+        "id": CHANNEL_ID,
+        "schedule": [
+            {"content_type": "insurance", "cron": {"day_of_week": "mon", "hour": 6, "minute": 0}},  # 9:00 MSK
+            {"content_type": "laws", "cron": {"day_of_week": "wed", "hour": 6, "minute": 0}},
+            {"content_type": "humor", "cron": {"day_of_week": "fri", "hour": 6, "minute": 0}},
+        ],
+    },
+]
+
 # Ключевые слова для фильтрации
 KEYWORDS = {
     "insurance": ["ОСАГО", "страхование", "КАСКО", "полис", "страховая", "КБМ", "автострахование"],
     "laws": ["ПДД", "закон", "ГИБДД", "штраф", "правила", "изменения", "автоправо", "водитель", "автомобиль"],
     "humor": ["юмор", "прикол", "мем", "шутка", "смешно", "забавно", "анекдот"]
 }
+
+# Почти-дубликаты: минимальное сходство (оценка Жаккара по MinHash), при котором пост считается повтором
+NEAR_DUPLICATE_THRESHOLD = 0.5
+
+# Ранжирование кандидатов: оценка = (свежесть * вес + доля ключевых слов * вес) * вес источника
+RANK_RECENCY_HALF_LIFE = 12 * 3600  # За сколько секунд вклад свежести падает вдвое
+RANK_RECENCY_WEIGHT = 1.0
+RANK_KEYWORD_WEIGHT = 0.5
+RANK_KEYWORD_CAP = 3  # Больше стольких разных ключевых слов оценку не повышают
+RANK_TOP_K = 10  # Сколько лучших кандидатов проверять на повторы перед публикацией
+
+# Вес источников по домену (поддомены наследуют вес), остальные - 1.0
+SOURCE_WEIGHTS = {
+    "banki.ru": 1.2,
+    "insur-info.ru": 1.2,
+    "consultant.ru": 1.1,
+    "garant.ru": 1.1,
+}
+
+# Фоновая предзагрузка кандидатов: по расписанию публикуется лучший пост из готового пула
+PREFETCH_INTERVAL = 5 * 60  # Период сбора, секунд; каждый источник опрашивается по своему расписанию (POLL_*)
+CANDIDATE_POOL_PICK = 20  # Сколько лучших кандидатов пула рассматривать при публикации
+CANDIDATE_POOL_MAX_AGE = 2 * 24 * 3600  # Кандидаты старше (секунд с последнего попадания в пул) удаляются
+
+# Частота опроса источников при предзагрузке: интервал ленты - время до появления в ней
+# ~POLL_TARGET_ITEMS новых элементов по скользящим средним (вес нового замера POLL_EWMA_ALPHA)
+POLL_TARGET_ITEMS = 1
+POLL_EWMA_ALPHA = 0.3
+POLL_MIN_INTERVAL = 5 * 60  # Не чаще, секунд
+POLL_MAX_INTERVAL = 6 * 3600  # Не реже, секунд
+POLL_PAGE_INTERVAL = 15 * 60  # Интервал для веб-страниц: без ключей элементов частоту новых не оценить
+POLL_JITTER = 0.2  # Случайный разброс интервала, +-доля
+
+# Живой сбор (пул пуст) идет потоком: источник -> проверка -> повторы -> выбор, с очередями между стадиями
+PIPELINE_QUEUE_SIZE = 4  # Порций постов в очереди между стадиями
+PIPELINE_GOOD_ENOUGH = 1.2  # Оценка кандидата (см. ranking), с которой он публикуется, не дожидаясь остальных источников
+PIPELINE_DEADLINE = 5  # Через сколько секунд публикуется лучший из уже найденных кандидатов
+
+# Просмотренные элементы лент (по GUID или ссылке) не разбираются и не проверяются повторно
+SEEN_RETENTION = 30 * 24 * 3600  # Сколько секунд помнить просмотренный элемент
+SEEN_BLOOM_CAPACITY = 100000  # Начальная емкость фильтра Блума, ключей
+SEEN_BLOOM_ERROR_RATE = 1e-5  # Доля ложных срабатываний (новый элемент принят за просмотренный)
+
+# Архив опубликованных постов: полнотекстовый поиск (Database.search_posts, python main.py --search "...")
+# и ежедневное обслуживание: удаление старых записей и сжатие файла БД
+PUBLISHED_RETENTION = 365 * 24 * 3600  # Сколько секунд хранить опубликованные посты
+MAINTENANCE_CRON = {"hour": 3, "minute": 30}  # Время обслуживания (UTC)
+VACUUM_FREE_RATIO = 0.2  # VACUUM, если свободные страницы занимают не меньше этой доли файла
+COVERAGE_WINDOW = 30 * 24 * 3600  # За сколько секунд ContentVerifier.recent_coverage ищет публикации по теме
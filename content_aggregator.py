@@ -1,182 +1,438 @@
 import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
-from config import SOURCES
+from config import (SOURCES, SHARED_SOURCES, FEED_SNAPSHOT_TTL,
+                    HTTP_TIMEOUT, HTTP_MAX_CONCURRENCY, HTTP_PER_HOST_CONCURRENCY,
+                    HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT, RSS_PARSER, RSS_ITEMS_LIMIT,
+                    FEED_MAX_BYTES, PAGE_PARSER, PAGE_MAX_BYTES, RAW_SNAPSHOT_DIR)
+from feed_parser import FeedParser, FEED_CHUNK_SIZE, parse_feed, parse_feed_soup
+from keyword_matcher import get_matcher
+from metrics import metrics
+from page_parser import PageParser, PAGE_CHUNK_SIZE, parse_page, parse_page_soup
+from poll_planner import PollPlanner
+from post_record import as_post
+from seen_index import SeenIndex
+from snapshot_store import SnapshotStore
+from source_health import SourceHealth
+from worker_pool import get_pool, run_in_pool
 import logging
-import re
 import ssl
+import time
+from urllib.parse import urlparse
 
 class ContentAggregator:
-    def __init__(self):
+    def __init__(self, db=None, session=None):
+        # БД для кэша условных запросов (ETag / Last-Modified), опционально
+        self.db = db
+        
         # Создаем кастомный SSL контекст для обхода проблем с сертификатами
         self.ssl_context = ssl.create_default_context()
         self.ssl_context.check_hostname = False
         self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        
+        # Общая сессия и лимиты параллельности создаются при первом запросе;
+        # готовая session (например, snapshot_store.ReplaySession) используется вместо сети
+        self.session = session
+        self.semaphore = None
+        self.host_semaphores = {}
+        
+        # Снимки лент: (url, planned) -> (время загрузки, посты); каждый url грузится не чаще раза за FEED_SNAPSHOT_TTL.
+        # Предзагрузка (planned) получает только непросмотренные элементы, живой сбор - всю ленту, поэтому снимки раздельные
+        self.snapshots = {}
+        self.inflight = {}
+        
+        # Здоровье источников: выключатели, адаптивные таймауты, порядок загрузки
+        self.health = SourceHealth(db)
+        self.statuses = {}
+        
+        # Просмотренные элементы лент: при предзагрузке пропускаются при разборе, дальше идут только новые.
+        # Живой сбор (пул пуст) их не пропускает: иначе после предзагрузки ему нечего было бы публиковать
+        self.seen = SeenIndex(db)
+        
+        # Частота опроса источников по их активности (только для фонового сбора, см. fetch_sources(planned=True))
+        self.planner = PollPlanner(db)
+        
+        # Архив сырых ответов (при воспроизведении не пополняется)
+        self.raw_store = SnapshotStore(RAW_SNAPSHOT_DIR) if RAW_SNAPSHOT_DIR and session is None else None
+        
+    async def get_session(self):
+        """Общая сессия с пулом keep-alive соединений и DNS-кэшем"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=self.ssl_context,
+                limit=HTTP_MAX_CONCURRENCY,
+                limit_per_host=HTTP_PER_HOST_CONCURRENCY,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+            )
+            timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout, headers=self.headers
+            )
+        return self.session
+        
+    async def close(self):
+        """Закрытие общей сессии"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
 
-    async def fetch_rss(self, url):
-        """Парсинг RSS-лент с улучшенной обработкой ошибок"""
+    def record_status(self, url, status):
+        """Статус последнего запроса к источнику: код HTTP, 'timeout' или 'error'"""
+        self.statuses[url] = status
+        metrics.inc('fetch_requests_total', source=url, status=status)
+        
+    def unseen(self, posts):
+        """Посты еще не просмотренных элементов; посты без ключа (страницы, старый кэш) считаются новыми"""
+        return [post for post in posts if not post.get('item_key') or post['item_key'] not in self.seen]
+        
+    async def save_raw(self, url, response, body):
+        """Сохранение прочитанного тела ответа в архив (если он включен); запись на диск - в потоке"""
+        if self.raw_store is None:
+            return
         try:
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-            timeout = aiohttp.ClientTimeout(total=15)
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.raw_store.save, url, response.status, dict(response.headers), body, time.time()
+            )
+        except Exception as e:
+            logging.error(f"❌ Ошибка сохранения ответа {url} в архив: {e}")
             
-            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
+    async def fetch_rss(self, url, timeout=None, planned=False):
+        """Парсинг RSS-лент с улучшенной обработкой ошибок; planned - только непросмотренные элементы"""
+        try:
+            # Условный запрос: сервер вернет 304, если лента не менялась. В кэше после предзагрузки только
+            # новые на тот момент элементы, поэтому живой сбор, которому нужна вся лента, запрашивает ее целиком
+            cache = await self.db.get_feed_cache(url) if self.db and planned else None
+            seen = self.seen.bloom if planned else None
+            headers = {}
+            if cache:
+                if cache['etag']:
+                    headers['If-None-Match'] = cache['etag']
+                if cache['last_modified']:
+                    headers['If-Modified-Since'] = cache['last_modified']
+                    
+            session = await self.get_session()
+            request_timeout = aiohttp.ClientTimeout(total=timeout or HTTP_TIMEOUT)
+            async with session.get(url, headers=headers, timeout=request_timeout) as response:
+                self.record_status(url, response.status)
+                if response.status == 304 and cache:
+                    await self.save_raw(url, response, None)
+                    posts = self.unseen(cache['items'])
+                    logging.info(f"♻️ Лента не изменилась, берем {len(posts)} новых постов из кэша: {url}")
+                    self.seen.stage(posts)
+                    return posts
+                elif response.status == 200:
+                    if RSS_PARSER == 'soup':
+                        data = await response.read()
                         content = await response.text()
-                        
-                        # Пробуем разные кодировки
-                        for encoding in ['utf-8', 'windows-1251', 'cp1251']:
-                            try:
-                                soup = BeautifulSoup(content, 'xml', from_encoding=encoding)
+                        await self.save_raw(url, response, data)
+                        metrics.observe('fetch_bytes', len(data), source=url)
+                        with metrics.timer('parse_seconds', source=url):
+                            posts = await run_in_pool(parse_feed_soup, content, url, RSS_ITEMS_LIMIT, seen)
+                    elif get_pool() is not None:
+                        # В пул уходит только разбор: ленту читаем порциями до RSS_ITEMS_LIMIT закрывающих тегов
+                        # элементов (лимит парсера тоже считает и просмотренные) и не больше FEED_MAX_BYTES
+                        chunks = []
+                        size = 0
+                        items = 0
+                        async for chunk in response.content.iter_chunked(FEED_CHUNK_SIZE):
+                            chunks.append(chunk[:FEED_MAX_BYTES - size])
+                            size += len(chunks[-1])
+                            items += chunk.count(b'</item>') + chunk.count(b'</entry>')
+                            if size >= FEED_MAX_BYTES or items >= RSS_ITEMS_LIMIT:
                                 break
-                            except:
-                                continue
-                        else:
-                            soup = BeautifulSoup(content, 'xml')
-                        
-                        posts = []
-                        
-                        # Ищем items в RSS или entries в Atom
-                        items = soup.find_all('item') or soup.find_all('entry')
-                        
-                        for item in items[:5]:  # Берем 5 последних
-                            try:
-                                title_elem = item.find('title')
-                                if not title_elem:
-                                    continue
-                                
-                                title = title_elem.get_text().strip()
-                                
-                                # Получаем ссылку
-                                link_elem = item.find('link')
-                                if link_elem:
-                                    link = link_elem.get('href') or link_elem.get_text()
-                                else:
-                                    guid_elem = item.find('guid')
-                                    link = guid_elem.get_text() if guid_elem else url
-                                
-                                # Получаем описание
-                                description_elem = item.find('description') or item.find('summary') or item.find('content')
-                                description = ""
-                                if description_elem:
-                                    description = description_elem.get_text().strip()[:300]
-                                
-                                # Если описание пустое, используем заголовок
-                                if not description:
-                                    description = title
-                                
-                                # Получаем дату
-                                pub_date_elem = item.find('pubdate') or item.find('published')
-                                pub_date = pub_date_elem.get_text() if pub_date_elem else ""
-                                
-                                post = {
-                                    'title': title,
-                                    'link': link,
-                                    'summary': description + "..." if len(description) > 100 else description,
-                                    'published': pub_date,
-                                    'source': url
-                                }
-                                posts.append(post)
-                                
-                            except Exception as e:
-                                logging.warning(f"Ошибка парсинга элемента в {url}: {e}")
-                                continue
-                        
-                        logging.info(f"✅ Успешно получено {len(posts)} постов из {url}")
-                        return posts
+                        data = b''.join(chunks)
+                        await self.save_raw(url, response, data)
+                        metrics.observe('fetch_bytes', size, source=url)
+                        with metrics.timer('parse_seconds', source=url):
+                            posts = await run_in_pool(parse_feed, data, url, RSS_ITEMS_LIMIT, seen)
                     else:
-                        logging.warning(f"⚠️ HTTP {response.status} для {url}")
-                        return []
-                        
+                        # Разбираем ленту по мере загрузки и прекращаем чтение после RSS_ITEMS_LIMIT постов
+                        parser = FeedParser(url, RSS_ITEMS_LIMIT, seen=seen)
+                        posts = []
+                        raw = []
+                        size = 0
+                        parse_time = 0.0
+                        async for chunk in response.content.iter_chunked(FEED_CHUNK_SIZE):
+                            size += len(chunk)
+                            if self.raw_store is not None:
+                                raw.append(chunk)
+                            start = time.perf_counter()
+                            posts.extend(parser.feed(chunk))
+                            parse_time += time.perf_counter() - start
+                            if parser.done:
+                                break
+                        start = time.perf_counter()
+                        posts.extend(parser.close())
+                        metrics.observe('parse_seconds', parse_time + time.perf_counter() - start, source=url)
+                        metrics.observe('fetch_bytes', size, source=url)
+                        # В архив попадает только прочитанная часть ленты: при воспроизведении разбор остановится там же
+                        await self.save_raw(url, response, b''.join(raw))
+                    
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                    if self.db and (etag or last_modified):
+                        await self.db.save_feed_cache(url, etag, last_modified, posts)
+                    
+                    if planned:
+                        self.seen.stage(posts)
+                        metrics.inc('feed_items_new_total', len(posts), source=url)
+                    logging.info(f"✅ Успешно получено {len(posts)} {'новых ' if planned else ''}постов из {url}")
+                    return posts
+                else:
+                    await self.save_raw(url, response, None)
+                    logging.warning(f"⚠️ HTTP {response.status} для {url}")
+                    return []
+                    
         except asyncio.TimeoutError:
+            self.record_status(url, 'timeout')
             logging.error(f"⏰ Таймаут при запросе к {url}")
             return []
         except Exception as e:
+            self.record_status(url, 'error')
             logging.error(f"❌ Ошибка парсинга RSS {url}: {str(e)}")
             return []
             
-    async def fetch_web_content(self, url):
+    async def fetch_web_content(self, url, timeout=None):
         """Парсинг веб-страниц с улучшенной обработкой"""
         try:
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-            timeout = aiohttp.ClientTimeout(total=15)
-            
-            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Убираем ненужные элементы
-                        for element in soup(["script", "style", "nav", "header", "footer"]):
-                            element.decompose()
-                        
-                        title = soup.find('title')
-                        title_text = title.get_text().strip() if title else "Без заголовка"
-                        
-                        # Ищем основной контент
-                        article = (soup.find('article') or 
-                                  soup.find('div', class_=re.compile('content|article|post|main')) or
-                                  soup.find('main') or
-                                  soup.find('body'))
-                        
-                        if article:
-                            text = article.get_text()
-                            # Очищаем текст от лишних пробелов
-                            text = ' '.join(text.split())
-                            summary = text[:200] + "..." if len(text) > 200 else text
-                        else:
-                            summary = "Читайте полную статью по ссылке"
-                        
-                        post = {
-                            'title': title_text,
-                            'link': url,
-                            'summary': summary,
-                            'source': url
-                        }
-                        return [post]
-                    else:
-                        logging.warning(f"⚠️ HTTP {response.status} для веб-страницы {url}")
-                        return []
-                        
+            session = await self.get_session()
+            request_timeout = aiohttp.ClientTimeout(total=timeout or HTTP_TIMEOUT)
+            async with session.get(url, timeout=request_timeout) as response:
+                self.record_status(url, response.status)
+                if response.status == 200:
+                    if PAGE_PARSER == 'soup':
+                        data = await response.read()
+                        await self.save_raw(url, response, data)
+                        metrics.observe('fetch_bytes', len(data), source=url)
+                        with metrics.timer('parse_seconds', source=url):
+                            return await run_in_pool(parse_page_soup, data, url, response.charset)
+                            
+                    if get_pool() is not None:
+                        # Читаем не больше PAGE_MAX_BYTES, разбор - в пуле, чтобы тяжелая страница не останавливала loop
+                        chunks = []
+                        size = 0
+                        async for chunk in response.content.iter_chunked(PAGE_CHUNK_SIZE):
+                            chunks.append(chunk[:PAGE_MAX_BYTES - size])
+                            size += len(chunks[-1])
+                            if size >= PAGE_MAX_BYTES:
+                                break
+                        data = b''.join(chunks)
+                        await self.save_raw(url, response, data)
+                        metrics.observe('fetch_bytes', size, source=url)
+                        with metrics.timer('parse_seconds', source=url):
+                            return await run_in_pool(parse_page, data, url, response.charset)
+                            
+                    # Разбираем страницу по мере загрузки и прекращаем чтение, как только найдены заголовок и статья
+                    parser = PageParser(url, response.charset, PAGE_MAX_BYTES)
+                    raw = []
+                    parse_time = 0.0
+                    async for chunk in response.content.iter_chunked(PAGE_CHUNK_SIZE):
+                        if self.raw_store is not None:
+                            raw.append(chunk)
+                        start = time.perf_counter()
+                        parser.feed(chunk)
+                        parse_time += time.perf_counter() - start
+                        if parser.done:
+                            break
+                    start = time.perf_counter()
+                    posts = parser.close()
+                    metrics.observe('parse_seconds', parse_time + time.perf_counter() - start, source=url)
+                    metrics.observe('fetch_bytes', parser.size, source=url)
+                    await self.save_raw(url, response, b''.join(raw))
+                    return posts
+                else:
+                    await self.save_raw(url, response, None)
+                    logging.warning(f"⚠️ HTTP {response.status} для веб-страницы {url}")
+                    return []
+                    
         except asyncio.TimeoutError:
+            self.record_status(url, 'timeout')
             logging.error(f"⏰ Таймаут при запросе к веб-странице {url}")
             return []
         except Exception as e:
+            self.record_status(url, 'error')
             logging.error(f"❌ Ошибка парсинга веб-страницы {url}: {str(e)}")
             return []
             
-    async def fetch_content(self, content_type):
-        """Основной метод сбора контента"""
-        sources = SOURCES.get(content_type, [])
+    async def fetch_source(self, source, planned=False):
+        """Загрузка одного источника с учетом общего и по-хостового лимитов; planned - предзагрузка"""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(HTTP_MAX_CONCURRENCY)
+        host = urlparse(source).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(HTTP_PER_HOST_CONCURRENCY)
+            
+        # Время считается после семафоров: ожидание в очереди не относится к источнику
+        async with self.semaphore, self.host_semaphores[host]:
+            timeout = self.health.timeout_for(source)
+            start = time.perf_counter()
+            with metrics.timer('fetch_seconds', source=source):
+                if self.is_feed(source):
+                    posts = await self.fetch_rss(source, timeout, planned)
+                else:
+                    posts = await self.fetch_web_content(source, timeout)
+            status = self.statuses.pop(source, 'error')
+            self.health.record(source, status in (200, 304), time.perf_counter() - start)
+            if planned and status in (200, 304):
+                # При предзагрузке fetch_rss отдает только непросмотренные элементы - это и есть новые
+                # с прошлой загрузки; живой сбор видит всю ленту, по нему частоту не оценить
+                self.planner.record(source, len(posts) if self.is_feed(source) else None)
+            return posts
+            
+    @staticmethod
+    def is_feed(source):
+        return any(ext in source for ext in ['.rss', '.xml', 'rss/'])
+            
+    async def load_feed(self, source, planned=False):
+        """Загрузка источника с сохранением снимка"""
+        try:
+            posts = await self.fetch_source(source, planned)
+            self.snapshots[source, planned] = (time.monotonic(), posts)
+            return posts
+        finally:
+            del self.inflight[source, planned]
+            
+    async def get_feed(self, source, planned=False):
+        """Посты источника из снимка, если он свежий, иначе одна общая загрузка;
+        planned - источник, у которого не подошел срок опроса, не загружаем (None)"""
+        snapshot = self.snapshots.get((source, planned))
+        if snapshot and time.monotonic() - snapshot[0] < FEED_SNAPSHOT_TTL:
+            return snapshot[1]
+            
+        # Параллельные запросы одного url из разных категорий ждут одну загрузку
+        task = self.inflight.get((source, planned))
+        if task is None:
+            await self.health.load()
+            if not self.health.allow(source):
+                # Выключатель открыт: не ждем таймаута, берем устаревший снимок, если он есть
+                metrics.inc('source_skipped_total', source=source)
+                logging.info(f"⏭️ Источник временно отключен после ошибок, пропускаем: {source}")
+                return snapshot[1] if snapshot else []
+            if planned and not self.planner.due(source):
+                # Новые элементы в источнике вряд ли появились: его посты уже в пуле кандидатов
+                metrics.inc('poll_deferred_total', source=source)
+                return None
+            task = asyncio.ensure_future(self.load_feed(source, planned))
+            self.inflight[source, planned] = task
+        return await asyncio.shield(task)
+        
+    async def fetch_sources(self, sources, planned=False):
+        """Параллельная загрузка источников; здоровые и быстрые первыми занимают лимиты параллельности.
+        planned - источники опрашиваются по расписанию PollPlanner, вместо постов отложенного None"""
+        await self.health.load()
+        await self.seen.load()
+        await self.planner.load()
+        order = sorted(range(len(sources)), key=lambda index: self.health.priority(sources[index]))
+        tasks = {index: asyncio.ensure_future(self.get_feed(sources[index], planned)) for index in order}
+        results = await asyncio.gather(*(tasks[index] for index in range(len(sources))), return_exceptions=True)
+        await self.health.save()
+        await self.planner.save()
+        
+        deferred = sum(1 for result in results if result is None)
+        if deferred:
+            logging.info(f"🗓️ Опрос {deferred} из {len(sources)} источников отложен до срока по расписанию")
+        return results
+        
+    async def stream_content(self, content_type, own_sources=None):
+        """Посты категории порциями по мере загрузки источников (асинхронный генератор). При досрочной
+        остановке незавершенные загрузки продолжаются в фоне и попадают в снимки лент"""
+        sources = self.sources_for(content_type, own_sources)
+        await self.health.load()
+        await self.seen.load()
+        await self.planner.load()
+        tasks = {asyncio.ensure_future(self.get_feed(source)): source
+                 for source in sorted(sources, key=self.health.priority)}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    source = tasks[task]
+                    if task.exception() is not None:
+                        logging.error(f"🔥 Критическая ошибка при обработке источника {source}: {task.exception()}")
+                        continue
+                    posts = self.select_posts(content_type, source, task.result(), own_sources)
+                    if posts:
+                        logging.info(f"📰 Из {source} получено {len(posts)} постов")
+                        yield posts
+                    else:
+                        logging.warning(f"📭 Не удалось получить посты из {source}")
+        finally:
+            await self.health.save()
+            await self.planner.save()
+            
+    def sources_for(self, content_type, own_sources=None):
+        """Источники категории: собственные (или заданные каналом) плюс общие ленты"""
+        sources = list(own_sources if own_sources is not None else SOURCES.get(content_type, []))
+        sources.extend(source for source in SHARED_SOURCES if source not in sources)
+        return sources
+        
+    def select_posts(self, content_type, source, posts, own_sources=None):
+        """Посты источника для категории: из общих лент - только подходящие по ключевым словам"""
+        if source in (own_sources if own_sources is not None else SOURCES.get(content_type, [])):
+            return posts
+        matches = get_matcher(content_type).search_batch([as_post(post).normalized for post in posts], normalized=True)
+        return [post for post, matched in zip(posts, matches) if matched]
+        
+    async def fetch_all(self, targets=None, planned=False):
+        """Загрузка всех уникальных источников один раз и раскладка постов по категориям.
+        targets - пары (категория, источники канала или None), по умолчанию все категории SOURCES;
+        возвращает список постов для каждой пары, planned - как в fetch_content"""
+        targets = targets if targets is not None else [(content_type, None) for content_type in SOURCES]
+        sources = []
+        for content_type, own_sources in targets:
+            sources.extend(source for source in self.sources_for(content_type, own_sources) if source not in sources)
+            
+        results = await self.fetch_sources(sources, planned)
+        
+        feeds = {}
+        for source, posts in zip(sources, results):
+            if isinstance(posts, Exception):
+                logging.error(f"🔥 Критическая ошибка при обработке источника {source}: {posts}")
+                continue
+            if posts is not None:
+                feeds[source] = posts
+                
+        contents = []
+        for content_type, own_sources in targets:
+            posts = []
+            for source in self.sources_for(content_type, own_sources):
+                posts.extend(self.select_posts(content_type, source, feeds.get(source, []), own_sources))
+            contents.append(posts)
+            
+        logging.info(f"📥 Собрано из {len(feeds)} из {len(sources)} уникальных источников: " +
+                     ", ".join(f"{content_type}={len(posts)}" for (content_type, _), posts in zip(targets, contents)))
+        return contents
+        
+    async def fetch_content(self, content_type, own_sources=None, planned=False):
+        """Основной метод сбора контента; own_sources - источники канала вместо SOURCES,
+        planned - ленты опрашиваются по мере появления в них новых элементов (фоновый сбор)"""
+        sources = self.sources_for(content_type, own_sources)
         all_posts = []
         
         logging.info(f"🔍 Начинаем сбор контента типа '{content_type}' из {len(sources)} источников")
         
-        for source in sources:
-            try:
-                if any(ext in source for ext in ['.rss', '.xml', 'rss/']):
-                    posts = await self.fetch_rss(source)
-                else:
-                    posts = await self.fetch_web_content(source)
-                    
-                if posts:
-                    all_posts.extend(posts)
-                    logging.info(f"📰 Из {source} получено {len(posts)} постов")
-                else:
-                    logging.warning(f"📭 Не удалось получить посты из {source}")
-                    
-            except Exception as e:
-                logging.error(f"🔥 Критическая ошибка при обработке источника {source}: {e}")
+        # Все источники загружаются параллельно, время сбора ~ самый медленный источник
+        results = await self.fetch_sources(sources, planned)
+        
+        for source, posts in zip(sources, results):
+            if isinstance(posts, Exception):
+                logging.error(f"🔥 Критическая ошибка при обработке источника {source}: {posts}")
                 continue
+            if posts is None:
+                continue
+                
+            # Из общих лент берем только посты, подходящие категории по ключевым словам
+            posts = self.select_posts(content_type, source, posts, own_sources)
+                
+            if posts:
+                all_posts.extend(posts)
+                logging.info(f"📰 Из {source} получено {len(posts)} постов")
+            else:
+                logging.warning(f"📭 Не удалось получить посты из {source}")
                 
         logging.info(f"📥 Всего собрано {len(all_posts)} постов для {content_type}")
         return all_posts
@@ -1,13 +1,20 @@
 import re
-from config import KEYWORDS
+from config import COVERAGE_WINDOW
+from datetime import datetime, timedelta, timezone
 import logging
+from metrics import metrics
+from post_record import as_post
+from ranking import Ranker
+from worker_pool import run_in_pool
 
 class ContentVerifier:
     def __init__(self):
         self.min_length = 50
         self.max_length = 1000
+        # Момент оценки свежести (unix time); None - текущее время, задается при воспроизведении архива
+        self.now = None
         
-    async def verify_source(self, url):
+    def is_trusted_source(self, url):
         """Проверка надежности источника"""
         trusted_domains = [
             'banki.ru', 'gibdd.ru', 'garant.ru', 'consultant.ru',
@@ -16,64 +23,100 @@ class ContentVerifier:
         
         return any(domain in url for domain in trusted_domains)
         
+    async def verify_source(self, url):
+        """Проверка надежности источника"""
+        return self.is_trusted_source(url)
+        
     def check_relevance(self, content, content_type):
         """Проверка релевантности по ключевым словам"""
-        keywords = KEYWORDS.get(content_type, [])
-        text = f"{content['title']} {content['summary']}".lower()
-        
-        # Считаем количество совпадений ключевых слов
-        matches = sum(1 for keyword in keywords if keyword.lower() in text)
+        # Считаем количество совпавших ключевых слов (с учетом словоформ); ранжирование берет его из кэша записи
+        matches = as_post(content).keyword_count(content_type)
         return matches >= 1  # Минимум 1 совпадение
         
+    def ranker(self, content_type):
+        """Оценка кандидатов категории на момент self.now (см. ranking.Ranker)"""
+        return Ranker(content_type, self.now)
+        
+    def score_batch(self, contents, content_type):
+        """Оценка кандидатов для пула (см. ranking.Ranker)"""
+        ranker = self.ranker(content_type)
+        return [ranker.score(content) for content in contents]
+        
     def check_quality(self, content):
         """Проверка качества контента"""
-        text = content['summary']
+        content = as_post(content)
         
         # Проверка длины
-        if len(text) < self.min_length:
+        if len(content.summary) < self.min_length:
             return False
             
         # Проверка на спам
+        text = content.summary_lower
         spam_indicators = ['казино', 'ставки', 'xxx', 'порно', 'viagra', 'гадание']
-        if any(indicator in text.lower() for indicator in spam_indicators):
+        if any(indicator in text for indicator in spam_indicators):
             return False
             
         # Проверка на кириллицу (основной язык)
-        cyrillic_chars = len(re.findall('[а-яё]', text.lower()))
+        cyrillic_chars = len(re.findall('[а-яё]', text))
         if cyrillic_chars < 10:  # Минимум 10 кириллических символов
             return False
             
         return True
         
-    async def verify_content(self, raw_content, content_type):
-        """Основная проверка контента"""
+    def verify_batch(self, raw_content, content_type):
+        """Проверка списка кандидатов; выполняется в пуле разбора. Возвращает посты и число отказов по правилам"""
         verified_content = []
+        rejected = {}
         
         for content in raw_content:
             try:
+                content = as_post(content)
+                
                 # Проверка источника
-                if not await self.verify_source(content['source']):
+                if not self.is_trusted_source(content.source):
+                    rejected['source'] = rejected.get('source', 0) + 1
                     continue
                     
                 # Проверка релевантности
                 if not self.check_relevance(content, content_type):
+                    rejected['relevance'] = rejected.get('relevance', 0) + 1
                     continue
                     
                 # Проверка качества
                 if not self.check_quality(content):
+                    rejected['quality'] = rejected.get('quality', 0) + 1
                     continue
                     
                 verified_content.append(content)
                 
             except Exception as e:
                 logging.error(f"Ошибка верификации контента: {e}")
+                rejected['error'] = rejected.get('error', 0) + 1
                 continue
                 
+        return verified_content, rejected
+        
+    async def verify_content(self, raw_content, content_type):
+        """Основная проверка контента"""
+        if not raw_content:
+            return []
+        with metrics.timer('verify_seconds', content_type=content_type):
+            verified_content, rejected = await run_in_pool(self.verify_batch, raw_content, content_type)
+        for rule, count in rejected.items():
+            metrics.inc('verify_rejected_total', count, content_type=content_type, rule=rule)
+        metrics.inc('verify_passed_total', len(verified_content), content_type=content_type)
         return verified_content
         
-    def select_best_post(self, verified_content):
+    def rank_posts(self, verified_content, content_type=None, k=1):
+        """k лучших постов по убыванию оценки: свежесть, ключевые слова, вес источника"""
+        return self.ranker(content_type).top_k(verified_content, k)
+        
+    def select_best_post(self, verified_content, content_type=None):
         """Выбор лучшего поста для публикации"""
-        # Сортировка по дате публикации (если есть) и релевантности
-        return sorted(verified_content, 
-                     key=lambda x: x.get('published', ''), 
-                     reverse=True)[0]
+        return self.rank_posts(verified_content, content_type)[0]
+        
+    async def recent_coverage(self, db, topic, content_type=None, channel_id=None, max_age=COVERAGE_WINDOW, limit=20):
+        """Публикации по теме (все слова topic) за последние max_age секунд - по полнотекстовому индексу БД"""
+        now = datetime.fromtimestamp(self.now, timezone.utc) if self.now is not None else datetime.now(timezone.utc)
+        return await db.search_posts(topic, content_type, channel_id, since=now - timedelta(seconds=max_age),
+                                     until=now, limit=limit)
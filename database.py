@@ -1,15 +1,65 @@
 import sqlite3
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import asyncio
 import json
+import logging
+import re
+from config import NEAR_DUPLICATE_THRESHOLD, CHANNEL_ID, VACUUM_FREE_RATIO
+from keyword_matcher import normalize, stem
+from similarity import minhash, band_keys, pack_signature, unpack_signature, similarity
+from metrics import metrics
+from post_record import PostRecord, as_post, as_dict, make_dedup_key
+
+SQLITE_MAX_PARAMS = 500  # Параметров в одном IN (...) запросе
+WORD_RE = re.compile(r'\w+')
+MIN_QUERY_WORD = 3  # Более короткие слова запроса (предлоги, союзы) в поиске не участвуют
+# Текст для полнотекстового индекса: токенизатор unicode61 не сводит ё к е (в запросах ё -> е, см. stem)
+FTS_COLUMNS = ("replace(replace({row}.title, 'ё', 'е'), 'Ё', 'Е'), "
+               "replace(replace({row}.content, 'ё', 'е'), 'Ё', 'Е')")
+
+def query_stems(text):
+    """Основы слов поискового запроса"""
+    return [stem(word) for word in WORD_RE.findall(text) if len(word) >= MIN_QUERY_WORD]
+
+def fts_query(text):
+    """Запрос FTS5 из произвольного текста: все слова (по основам, любые окончания) должны встретиться"""
+    return ' '.join(f'"{word_stem}"*' for word_stem in query_stems(text))
+
+def sql_time(moment):
+    """datetime -> строка времени в формате CURRENT_TIMESTAMP (UTC)"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
 
 class Database:
     def __init__(self, db_path="autoinsider.db"):
         self.db_path = db_path
+        
+        # Одно долгоживущее соединение; все запросы выполняются в отдельном потоке,
+        # чтобы работа с диском не блокировала event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-8000')  # ~8 МБ кэша страниц
+        self.conn.execute('PRAGMA busy_timeout=5000')
+        self.fts = False  # Есть ли полнотекстовый индекс опубликованных постов (SQLite без FTS5 - нет)
         self.init_db()
         
     def init_db(self):
         """Инициализация базы данных"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.conn as conn:
+            # Миграция старых баз: уникальность (title, source) была общей для всех каналов,
+            # теперь она своя у каждого канала - пересоздаем таблицу без этого ограничения
+            table = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'published_posts'"
+            ).fetchone()
+            migrate = table is not None and 'UNIQUE(title, source)' in table[0]
+            if migrate:
+                conn.execute('ALTER TABLE published_posts RENAME TO published_posts_old')
+                
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS published_posts (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -18,32 +68,688 @@ class Database:
                     source TEXT NOT NULL,
                     content_type TEXT NOT NULL,
                     published_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(title, source)
+                    dedup_key TEXT,
+                    channel_id TEXT
+                )
+            ''')
+            if migrate:
+                conn.execute('''
+                    INSERT INTO published_posts (id, title, content, source, content_type, published_at)
+                    SELECT id, title, content, source, content_type, published_at FROM published_posts_old
+                ''')
+                conn.execute('DROP TABLE published_posts_old')
+                
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS feed_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    items TEXT NOT NULL,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
             
-    async def save_post(self, post_data, content_type):
+            # Заполняем ключ дедупликации и канал у перенесенных записей
+            rows = conn.execute(
+                'SELECT id, title, source FROM published_posts WHERE dedup_key IS NULL'
+            ).fetchall()
+            conn.executemany(
+                'UPDATE published_posts SET dedup_key = ? WHERE id = ?',
+                [(make_dedup_key(title, source), post_id) for post_id, title, source in rows]
+            )
+            conn.execute('UPDATE published_posts SET channel_id = ? WHERE channel_id IS NULL', (CHANNEL_ID,))
+            conn.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS idx_published_posts_dedup '
+                'ON published_posts(channel_id, dedup_key)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_published_posts_time ON published_posts(published_at)')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_published_posts_type '
+                'ON published_posts(content_type, published_at)'
+            )
+            self._init_fts(conn)
+            
+            # Очередь исходящих сообщений Telegram, переживающая перезапуск
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    post TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status)')
+            
+            # Пул проверенных кандидатов, которые собирает фоновая предзагрузка
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS candidate_pool (
+                    channel_id TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    post TEXT NOT NULL,
+                    score REAL NOT NULL DEFAULT 0,
+                    collected_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (channel_id, content_type, dedup_key)
+                )
+            ''')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_candidate_pool_score '
+                'ON candidate_pool(channel_id, content_type, score)'
+            )
+            
+            # Здоровье источников и состояние их автоматических выключателей
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS source_health (
+                    url TEXT PRIMARY KEY,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                    latency_ewma REAL,
+                    success_ewma REAL NOT NULL DEFAULT 1,
+                    state TEXT NOT NULL DEFAULT 'closed',
+                    open_until REAL NOT NULL DEFAULT 0,
+                    opens INTEGER NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Частота обновления источников и срок следующего опроса (poll_planner)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS feed_schedule (
+                    url TEXT PRIMARY KEY,
+                    items_ewma REAL,
+                    seconds_ewma REAL,
+                    last_fetch REAL,
+                    next_fetch REAL NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Расписание планировщика и записи о запусках (не больше одного выполнения на время запуска)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    next_run_time TEXT,
+                    last_run_time TEXT,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_runs (
+                    job_id TEXT NOT NULL,
+                    scheduled_at TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    finished_at DATETIME,
+                    PRIMARY KEY (job_id, scheduled_at)
+                )
+            ''')
+            
+            # Просмотренные элементы лент (ключ - хэш ленты и GUID или ссылки)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS seen_items (
+                    item_key TEXT PRIMARY KEY,
+                    seen_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_seen_items_seen_at ON seen_items(seen_at)')
+            
+            # MinHash-подписи опубликованных постов и ключи их LSH-полос
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS post_signatures (
+                    post_id INTEGER PRIMARY KEY,
+                    signature BLOB NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS post_signature_bands (
+                    band_key INTEGER NOT NULL,
+                    post_id INTEGER NOT NULL
+                )
+            ''')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_post_signature_bands_key ON post_signature_bands(band_key)'
+            )
+            rows = conn.execute('''
+                SELECT id, title, content FROM published_posts
+                WHERE id NOT IN (SELECT post_id FROM post_signatures)
+            ''').fetchall()
+            for post_id, title, content in rows:
+                self._insert_signature(conn, post_id, f"{title} {content}")
+            
+    def _init_fts(self, conn):
+        # Полнотекстовый индекс заголовков и текстов опубликованных постов. Хранит только индекс, текст
+        # берется из представления published_posts_text (посты с ё -> е); в синхронизации с published_posts
+        # индекс держат триггеры на вставку, изменение и удаление
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'published_posts_fts'"
+        ).fetchone() is not None
+        conn.execute(f'''
+            CREATE VIEW IF NOT EXISTS published_posts_text (id, title, content) AS
+            SELECT p.id, {FTS_COLUMNS.format(row='p')} FROM published_posts p
+        ''')
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS published_posts_fts USING fts5(
+                    title, content,
+                    content='published_posts_text', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logging.warning(f"⚠️ Полнотекстовый поиск недоступен (SQLite без FTS5), ищем перебором: {e}")
+            return
+        insert = (f"INSERT INTO published_posts_fts (rowid, title, content) "
+                  f"VALUES (new.id, {FTS_COLUMNS.format(row='new')});")
+        delete = (f"INSERT INTO published_posts_fts (published_posts_fts, rowid, title, content) "
+                  f"VALUES ('delete', old.id, {FTS_COLUMNS.format(row='old')});")
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS published_posts_fts_insert AFTER INSERT ON published_posts '
+                     f'BEGIN {insert} END')
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS published_posts_fts_delete AFTER DELETE ON published_posts '
+                     f'BEGIN {delete} END')
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS published_posts_fts_update AFTER UPDATE OF title, content '
+                     f'ON published_posts BEGIN {delete} {insert} END')
+        if not exists:
+            # Индекс появился в уже заполненной базе: строим его по существующим постам
+            conn.execute("INSERT INTO published_posts_fts (published_posts_fts) VALUES ('rebuild')")
+        self.fts = True
+        
+    def _insert_signature(self, conn, post_id, text):
+        signature = minhash(text)
+        if signature is None:
+            return
+        conn.execute(
+            'INSERT OR REPLACE INTO post_signatures (post_id, signature) VALUES (?, ?)',
+            (post_id, pack_signature(signature))
+        )
+        conn.executemany(
+            'INSERT INTO post_signature_bands (band_key, post_id) VALUES (?, ?)',
+            [(key, post_id) for key in band_keys(signature)]
+        )
+        
+    async def run(self, func, *args):
+        """Выполнение функции работы с БД в потоке базы данных"""
+        loop = asyncio.get_running_loop()
+        with metrics.timer('db_query_seconds', query=func.__name__.lstrip('_')):
+            return await loop.run_in_executor(self.executor, func, *args)
+        
+    def close(self):
+        """Закрытие соединения и потока базы данных"""
+        self.executor.shutdown(wait=True)
+        self.conn.close()
+        
+    def _save_post(self, post_data, content_type, channel_id):
+        post_data = as_post(post_data)
+        try:
+            with self.conn as conn:
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO published_posts
+                    (title, content, source, content_type, dedup_key, channel_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    post_data.title,
+                    post_data.summary,
+                    post_data.source,
+                    content_type,
+                    post_data.dedup_key,
+                    channel_id
+                ))
+                if cursor.rowcount:
+                    self._insert_signature(conn, cursor.lastrowid, post_data.text)
+                conn.execute(
+                    'DELETE FROM candidate_pool WHERE channel_id = ? AND dedup_key = ?',
+                    (channel_id, post_data.dedup_key)
+                )
+        except Exception as e:
+            print(f"Ошибка сохранения в БД: {e}")
+            
+    async def save_post(self, post_data, content_type, channel_id=CHANNEL_ID):
         """Сохранение опубликованного поста"""
+        await self.run(self._save_post, post_data, content_type, channel_id)
+        
+    def _is_posted(self, title, source, channel_id):
+        cursor = self.conn.execute(
+            'SELECT 1 FROM published_posts WHERE channel_id = ? AND dedup_key = ?',
+            (channel_id, make_dedup_key(title, source))
+        )
+        return cursor.fetchone() is not None
+        
+    async def is_posted(self, title, source, channel_id=CHANNEL_ID):
+        """Проверка, был ли пост уже опубликован в канале"""
+        return await self.run(self._is_posted, title, source, channel_id)
+        
+    def _filter_unposted(self, candidates, channel_id):
+        keys = [as_post(post).dedup_key for post in candidates]
+        posted = set()
+        for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+            chunk = keys[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            posted.update(row[0] for row in self.conn.execute(
+                f'SELECT dedup_key FROM published_posts WHERE channel_id = ? AND dedup_key IN ({placeholders})',
+                [channel_id, *chunk]
+            ))
+        return [post for post, key in zip(candidates, keys) if key not in posted]
+        
+    async def filter_unposted(self, candidates, channel_id=CHANNEL_ID):
+        """Кандидаты, которые еще не публиковались в канале (один запрос на весь список)"""
+        return await self.run(self._filter_unposted, candidates, channel_id)
+        
+    def _filter_near_duplicates(self, candidates, channel_id):
+        signatures = [minhash(as_post(post).text) for post in candidates]
+        keys_by_candidate = [band_keys(signature) if signature else [] for signature in signatures]
+        
+        # Кандидаты в дубликаты - посты с хотя бы одной общей полосой, одним запросом на список
+        all_keys = list({key for keys in keys_by_candidate for key in keys})
+        posts_by_key = {}
+        archived = {}
+        for start in range(0, len(all_keys), SQLITE_MAX_PARAMS):
+            chunk = all_keys[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            for key, post_id, blob in self.conn.execute(f'''
+                SELECT b.band_key, b.post_id, s.signature
+                FROM post_signature_bands b
+                JOIN post_signatures s ON s.post_id = b.post_id
+                JOIN published_posts p ON p.id = b.post_id
+                WHERE b.band_key IN ({placeholders}) AND p.channel_id = ?
+            ''', [*chunk, channel_id]):
+                posts_by_key.setdefault(key, set()).add(post_id)
+                if post_id not in archived:
+                    archived[post_id] = unpack_signature(blob)
+                    
+        unique = []
+        for post, signature, keys in zip(candidates, signatures, keys_by_candidate):
+            matched = {post_id for key in keys for post_id in posts_by_key.get(key, ())}
+            if any(similarity(signature, archived[post_id]) >= NEAR_DUPLICATE_THRESHOLD for post_id in matched):
+                continue
+            unique.append(post)
+        return unique
+        
+    async def filter_near_duplicates(self, candidates, channel_id=CHANNEL_ID):
+        """Кандидаты без почти-дубликатов среди опубликованных в канале постов (MinHash LSH)"""
+        return await self.run(self._filter_near_duplicates, candidates, channel_id)
+        
+    def _get_feed_cache(self, url):
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            row = self.conn.execute(
+                'SELECT etag, last_modified, items FROM feed_cache WHERE url = ?',
+                (url,)
+            ).fetchone()
+        except Exception as e:
+            print(f"Ошибка чтения кэша ленты: {e}")
+            return None
+            
+        if row is None:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'items': [PostRecord.from_dict(item) for item in json.loads(row[2])]
+        }
+        
+    async def get_feed_cache(self, url):
+        """Получение сохраненных ETag, Last-Modified и постов ленты"""
+        return await self.run(self._get_feed_cache, url)
+        
+    def _save_feed_cache(self, url, etag, last_modified, items):
+        try:
+            with self.conn as conn:
                 conn.execute('''
-                    INSERT OR IGNORE INTO published_posts 
-                    (title, content, source, content_type) 
-                    VALUES (?, ?, ?, ?)
+                    INSERT OR REPLACE INTO feed_cache
+                    (url, etag, last_modified, items, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
                 ''', (
-                    post_data['title'],
-                    post_data['summary'],
-                    post_data['source'],
-                    content_type
+                    url,
+                    etag,
+                    last_modified,
+                    json.dumps([as_dict(item) for item in items], ensure_ascii=False),
+                    datetime.now().isoformat()
                 ))
         except Exception as e:
-            print(f"Ошибка сохранения в БД: {e}")
+            print(f"Ошибка сохранения кэша ленты: {e}")
+            
+    async def save_feed_cache(self, url, etag, last_modified, items):
+        """Сохранение валидаторов и постов ленты для условных запросов"""
+        await self.run(self._save_feed_cache, url, etag, last_modified, items)
+        
+    def _add_outbox(self, chat_id, text, content_type, post):
+        with self.conn as conn:
+            cursor = conn.execute(
+                'INSERT INTO outbox (chat_id, text, content_type, post) VALUES (?, ?, ?, ?)',
+                (chat_id, text, content_type, json.dumps(as_dict(post), ensure_ascii=False))
+            )
+            return cursor.lastrowid
+            
+    async def add_outbox(self, chat_id, text, content_type, post):
+        """Сохранение сообщения в очередь отправки, возвращает id"""
+        return await self.run(self._add_outbox, chat_id, text, content_type, post)
+        
+    def _update_outbox(self, message_id, status, attempts):
+        with self.conn as conn:
+            conn.execute(
+                'UPDATE outbox SET status = ?, attempts = ? WHERE id = ?',
+                (status, attempts, message_id)
+            )
+            
+    async def update_outbox(self, message_id, status, attempts):
+        """Обновление статуса сообщения: pending, sent или failed"""
+        await self.run(self._update_outbox, message_id, status, attempts)
+        
+    def _get_pending_outbox(self):
+        rows = self.conn.execute(
+            "SELECT id, chat_id, text, content_type, post, attempts FROM outbox WHERE status = 'pending' ORDER BY id"
+        ).fetchall()
+        return [
+            {
+                'id': row[0],
+                'chat_id': row[1],
+                'text': row[2],
+                'content_type': row[3],
+                'post': PostRecord.from_dict(json.loads(row[4])),
+                'attempts': row[5]
+            }
+            for row in rows
+        ]
+        
+    async def get_pending_outbox(self):
+        """Неотправленные сообщения, оставшиеся с прошлого запуска"""
+        return await self.run(self._get_pending_outbox)
+        
+    def _add_candidates(self, candidates, scores, content_type, channel_id):
+        with self.conn as conn:
+            conn.executemany('''
+                INSERT INTO candidate_pool (channel_id, content_type, dedup_key, post, score, collected_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (channel_id, content_type, dedup_key)
+                DO UPDATE SET post = excluded.post, score = excluded.score, collected_at = excluded.collected_at
+            ''', [
+                (
+                    channel_id,
+                    content_type,
+                    as_post(post).dedup_key,
+                    json.dumps(as_dict(post), ensure_ascii=False),
+                    score
+                )
+                for post, score in zip(candidates, scores)
+            ])
+            
+    async def add_candidates(self, candidates, scores, content_type, channel_id=CHANNEL_ID):
+        """Добавление (или обновление) кандидатов в пул канала"""
+        await self.run(self._add_candidates, candidates, scores, content_type, channel_id)
+        
+    def _get_candidates(self, content_type, channel_id, limit):
+        rows = self.conn.execute('''
+            SELECT c.post FROM candidate_pool c
+            WHERE c.channel_id = ? AND c.content_type = ? AND NOT EXISTS (
+                SELECT 1 FROM published_posts p WHERE p.channel_id = c.channel_id AND p.dedup_key = c.dedup_key
+            )
+            ORDER BY c.score DESC, c.collected_at DESC
+            LIMIT ?
+        ''', (channel_id, content_type, limit)).fetchall()
+        return [PostRecord.from_dict(json.loads(row[0])) for row in rows]
+        
+    async def get_candidates(self, content_type, channel_id=CHANNEL_ID, limit=20):
+        """Лучшие по оценке неопубликованные кандидаты из пула"""
+        return await self.run(self._get_candidates, content_type, channel_id, limit)
+        
+    def _prune_candidates(self, max_age):
+        with self.conn as conn:
+            conn.execute(
+                "DELETE FROM candidate_pool WHERE collected_at < datetime('now', ?)",
+                (f'-{int(max_age)} seconds',)
+            )
+            
+    async def prune_candidates(self, max_age):
+        """Удаление кандидатов, которых не было в лентах дольше max_age секунд"""
+        await self.run(self._prune_candidates, max_age)
+        
+    def _search_posts(self, query, content_type, channel_id, since, until, limit):
+        stems = query_stems(query)
+        if not stems:
+            return []
+        conditions = []
+        params = []
+        if self.fts:
+            source = 'published_posts_fts f JOIN published_posts p ON p.id = f.rowid'
+            conditions.append('published_posts_fts MATCH ?')
+            params.append(fts_query(query))
+            order = 'f.rank'
+        else:
+            source = 'published_posts p'
+            order = 'p.published_at DESC'
+        if content_type is not None:
+            conditions.append('p.content_type = ?')
+            params.append(content_type)
+        if channel_id is not None:
+            conditions.append('p.channel_id = ?')
+            params.append(channel_id)
+        if since is not None:
+            conditions.append('p.published_at >= ?')
+            params.append(sql_time(since))
+        if until is not None:
+            conditions.append('p.published_at < ?')
+            params.append(sql_time(until))
+        where = ' AND '.join(conditions) or '1'
+        rows = self.conn.execute(f'''
+            SELECT p.id, p.title, p.content, p.source, p.content_type, p.channel_id, p.published_at
+            FROM {source}
+            WHERE {where}
+            ORDER BY {order}
+            {'LIMIT ?' if self.fts else ''}
+        ''', [*params, limit] if self.fts else params).fetchall()
+        if not self.fts:
+            # Без индекса - перебор постов за период (LIKE в SQLite не различает регистр только для латиницы)
+            rows = [row for row in rows if all(word_stem in normalize(f"{row[1]} {row[2]}") for word_stem in stems)]
+            rows = rows[:limit]
+        return [
+            {
+                'id': row[0],
+                'title': row[1],
+                'summary': row[2],
+                'source': row[3],
+                'content_type': row[4],
+                'channel_id': row[5],
+                'published_at': row[6]
+            }
+            for row in rows
+        ]
+        
+    async def search_posts(self, query, content_type=None, channel_id=None, since=None, until=None, limit=20):
+        """Опубликованные посты, в которых встречаются все слова запроса (с любыми окончаниями),
+        по релевантности; since / until - границы времени публикации (datetime, UTC)"""
+        return await self.run(self._search_posts, query, content_type, channel_id, since, until, limit)
+        
+    def _prune_published(self, max_age):
+        with self.conn as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM published_posts WHERE published_at < datetime('now', ?)",
+                (f'-{int(max_age)} seconds',)
+            )]
+            for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+                chunk = ids[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                conn.execute(f'DELETE FROM post_signature_bands WHERE post_id IN ({placeholders})', chunk)
+                conn.execute(f'DELETE FROM post_signatures WHERE post_id IN ({placeholders})', chunk)
+                conn.execute(f'DELETE FROM published_posts WHERE id IN ({placeholders})', chunk)
+            conn.execute(
+                "DELETE FROM outbox WHERE status != 'pending' AND created_at < datetime('now', ?)",
+                (f'-{int(max_age)} seconds',)
+            )
+            conn.execute(
+                "DELETE FROM job_runs WHERE started_at < datetime('now', ?)",
+                (f'-{int(max_age)} seconds',)
+            )
+        return len(ids)
+        
+    async def prune_published(self, max_age):
+        """Удаление опубликованных постов старше max_age секунд (с подписями и записью в индексе),
+        а также отправленных сообщений и записей о запусках того же возраста. Возвращает число постов"""
+        return await self.run(self._prune_published, max_age)
+        
+    def _compact(self):
+        if self.fts:
+            # Слияние сегментов полнотекстового индекса после вставок и удалений
+            with self.conn as conn:
+                conn.execute("INSERT INTO published_posts_fts (published_posts_fts) VALUES ('optimize')")
+        pages = self.conn.execute('PRAGMA page_count').fetchone()[0]
+        free = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if pages and free / pages >= VACUUM_FREE_RATIO:
+            self.conn.execute('VACUUM')
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            return free
+        return 0
+        
+    async def compact(self):
+        """Оптимизация полнотекстового индекса и VACUUM, если свободных страниц не меньше
+        VACUUM_FREE_RATIO файла. Возвращает число освобожденных страниц"""
+        return await self.run(self._compact)
+        
+    def _get_seen_keys(self):
+        return [row[0] for row in self.conn.execute('SELECT item_key FROM seen_items')]
+        
+    async def get_seen_keys(self):
+        """Ключи всех просмотренных элементов лент"""
+        return await self.run(self._get_seen_keys)
+        
+    def _add_seen_keys(self, keys):
+        with self.conn as conn:
+            conn.executemany('INSERT OR IGNORE INTO seen_items (item_key) VALUES (?)', [(key,) for key in keys])
+            
+    async def add_seen_keys(self, keys):
+        """Отметка элементов лент просмотренными"""
+        await self.run(self._add_seen_keys, keys)
+        
+    def _prune_seen_keys(self, max_age):
+        with self.conn as conn:
+            conn.execute(
+                "DELETE FROM seen_items WHERE seen_at < datetime('now', ?)",
+                (f'-{int(max_age)} seconds',)
+            )
+            
+    async def prune_seen_keys(self, max_age):
+        """Удаление ключей старше max_age секунд"""
+        await self.run(self._prune_seen_keys, max_age)
+        
+    def _get_source_health(self):
+        return self.conn.execute('''
+            SELECT url, successes, failures, consecutive_failures, latency_ewma,
+                   success_ewma, state, open_until, opens
+            FROM source_health
+        ''').fetchall()
+        
+    async def get_source_health(self):
+        """Сохраненное состояние всех источников"""
+        return await self.run(self._get_source_health)
+        
+    def _save_source_health(self, rows):
+        with self.conn as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO source_health
+                (url, successes, failures, consecutive_failures, latency_ewma,
+                 success_ewma, state, open_until, opens, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', rows)
+            
+    async def save_source_health(self, rows):
+        """Сохранение состояния источников"""
+        await self.run(self._save_source_health, rows)
+        
+    def _get_feed_schedule(self):
+        return self.conn.execute('''
+            SELECT url, items_ewma, seconds_ewma, last_fetch, next_fetch
+            FROM feed_schedule
+        ''').fetchall()
+        
+    async def get_feed_schedule(self):
+        """Сохраненное расписание опроса всех источников"""
+        return await self.run(self._get_feed_schedule)
+        
+    def _save_feed_schedule(self, rows):
+        with self.conn as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO feed_schedule
+                (url, items_ewma, seconds_ewma, last_fetch, next_fetch, updated_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', rows)
             
-    def is_posted(self, title, source):
-        """Проверка, был ли пост уже опубликован"""
-        with sqlite3.connect(self.db_path) as conn:
+    async def save_feed_schedule(self, rows):
+        """Сохранение расписания опроса источников"""
+        await self.run(self._save_feed_schedule, rows)
+        
+    def _get_job_states(self):
+        rows = self.conn.execute(
+            'SELECT job_id, next_run_time FROM scheduled_jobs WHERE next_run_time IS NOT NULL'
+        ).fetchall()
+        return {job_id: datetime.fromisoformat(next_run_time) for job_id, next_run_time in rows}
+        
+    async def get_job_states(self):
+        """Сохраненное время следующего запуска заданий планировщика"""
+        return await self.run(self._get_job_states)
+        
+    def _save_job_state(self, job_id, next_run_time, last_run_time):
+        with self.conn as conn:
+            conn.execute('''
+                INSERT INTO scheduled_jobs (job_id, next_run_time, last_run_time, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    next_run_time = excluded.next_run_time,
+                    last_run_time = COALESCE(excluded.last_run_time, last_run_time),
+                    updated_at = excluded.updated_at
+            ''', (
+                job_id,
+                next_run_time.isoformat() if next_run_time else None,
+                last_run_time.isoformat() if last_run_time else None
+            ))
+            
+    async def save_job_state(self, job_id, next_run_time, last_run_time):
+        """Сохранение времени следующего (и последнего) запуска задания"""
+        await self.run(self._save_job_state, job_id, next_run_time, last_run_time)
+        
+    def _claim_job_run(self, job_id, scheduled_at, status):
+        with self.conn as conn:
             cursor = conn.execute(
-                'SELECT 1 FROM published_posts WHERE title = ? AND source = ?',
-                (title, source)
+                'INSERT OR IGNORE INTO job_runs (job_id, scheduled_at, status) VALUES (?, ?, ?)',
+                (job_id, scheduled_at.isoformat(), status)
             )
-            return cursor.fetchone() is not None
+            return cursor.rowcount > 0
+            
+    async def claim_job_run(self, job_id, scheduled_at, status='running'):
+        """Запись о запуске; False, если этот запуск уже был"""
+        return await self.run(self._claim_job_run, job_id, scheduled_at, status)
+        
+    def _finish_job_run(self, job_id, scheduled_at, status):
+        with self.conn as conn:
+            conn.execute(
+                'UPDATE job_runs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE job_id = ? AND scheduled_at = ?',
+                (status, job_id, scheduled_at.isoformat())
+            )
+            
+    async def finish_job_run(self, job_id, scheduled_at, status):
+        """Итог запуска: done или failed"""
+        await self.run(self._finish_job_run, job_id, scheduled_at, status)
+        
+    def _interrupt_job_runs(self):
+        with self.conn as conn:
+            rows = conn.execute("SELECT job_id, scheduled_at FROM job_runs WHERE status = 'running'").fetchall()
+            conn.execute("UPDATE job_runs SET status = 'interrupted' WHERE status = 'running'")
+        return [(job_id, datetime.fromisoformat(scheduled_at)) for job_id, scheduled_at in rows]
+        
+    async def interrupt_job_runs(self):
+        """Запуски, оборванные перезапуском процесса: отмечаются interrupted, возвращаются (задание, время)"""
+        return await self.run(self._interrupt_job_runs)
+        
+    def _resume_job_run(self, job_id, scheduled_at):
+        with self.conn as conn:
+            cursor = conn.execute(
+                "UPDATE job_runs SET status = 'running', started_at = CURRENT_TIMESTAMP, finished_at = NULL "
+                "WHERE job_id = ? AND scheduled_at = ? AND status = 'interrupted'",
+                (job_id, scheduled_at.isoformat())
+            )
+            return cursor.rowcount > 0
+            
+    async def resume_job_run(self, job_id, scheduled_at):
+        """Повторный захват прерванного запуска; False, если его уже повторили"""
+        return await self.run(self._resume_job_run, job_id, scheduled_at)
@@ -0,0 +1,246 @@
+from collections import deque
+from xml.parsers import expat
+from bs4 import BeautifulSoup
+from post_record import PostRecord
+import hashlib
+import html.entities
+import logging
+
+FEED_CHUNK_SIZE = 16 * 1024  # Размер порции байтов для потокового парсинга
+
+# Элементы ленты и поля, которые нужны для поста (имена в нижнем регистре)
+ITEM_TAGS = ('item', 'entry')
+FIELD_TAGS = ('title', 'link', 'guid', 'description', 'summary', 'content', 'pubdate', 'published')
+
+
+def item_key(fields, url):
+    """Ключ элемента ленты для индекса просмотренных: хэш ленты и GUID (иначе ссылки или заголовка)"""
+    ident = fields.get('guid') or fields.get('link_href') or fields.get('link') or fields.get('title')
+    if ident is None:
+        return None
+    return hashlib.sha1(f"{url}\n{ident.strip()}".encode('utf-8')).hexdigest()
+
+
+def make_post(fields, url, key=None):
+    """Сборка поста из полей элемента ленты (те же поля, что и у старого парсера); время публикации
+    разбирается при первом обращении (ранжирование), а не для каждого элемента"""
+    if 'title' not in fields:
+        return None
+
+    title = fields['title'].strip()
+
+    # Получаем ссылку
+    if 'link' in fields:
+        link = fields.get('link_href') or fields['link']
+    else:
+        link = fields.get('guid', url)
+
+    # Получаем описание
+    description = fields.get('description', fields.get('summary', fields.get('content', '')))
+    description = description.strip()[:300]
+
+    # Если описание пустое, используем заголовок
+    if not description:
+        description = title
+
+    # Получаем дату
+    pub_date = fields.get('pubdate', fields.get('published', ''))
+
+    return PostRecord(
+        title,
+        link,
+        description + "..." if len(description) > 100 else description,
+        published=pub_date,
+        source=url,
+        item_key=key or item_key(fields, url)
+    )
+
+
+class FeedParser:
+    """Потоковый парсер RSS/Atom на expat: принимает байты порциями и останавливается после limit элементов;
+    элементы, ключ которых есть в seen (см. seen_index), пропускаются без сборки поста, но входят в limit"""
+
+    def __init__(self, url, limit=None, encoding=None, seen=None):
+        self.url = url
+        self.limit = limit
+        self.encoding = encoding
+        self.seen = seen
+        self.count = 0
+        self.done = False
+        self.error = None
+
+        self.ready = deque()
+        # Байты до первого поста храним, чтобы перезапуститься в cp1251
+        self.buffer = []
+        self.parser = self._create_parser(encoding)
+        self._reset_item()
+
+    def _create_parser(self, encoding):
+        # Кодировку из XML-декларации expat определяет сам, encoding ее переопределяет
+        parser = expat.ParserCreate(encoding)
+        # Внешний DTD разрешает HTML-сущности вроде &nbsp; без ошибки разбора
+        parser.UseForeignDTD(True)
+        parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_UNLESS_STANDALONE)
+        parser.buffer_text = True
+        parser.StartElementHandler = self._start
+        parser.EndElementHandler = self._end
+        parser.CharacterDataHandler = self._data
+        parser.SkippedEntityHandler = self._entity
+        return parser
+
+    def _reset_item(self):
+        self.item = None
+        self.depth = 0
+        self.field = None
+        self.field_depth = 0
+        self.text = []
+
+    def _start(self, name, attrs):
+        tag = name.lower()
+        if self.item is None:
+            if tag in ITEM_TAGS:
+                self.item = {}
+            return
+
+        self.depth += 1
+        # Как и find() в BeautifulSoup, берем первое вхождение каждого поля
+        if self.field is None and tag in FIELD_TAGS and tag not in self.item:
+            self.field = tag
+            self.field_depth = self.depth
+            self.text = []
+            if tag == 'link':
+                self.item['link_href'] = attrs.get('href')
+
+    def _end(self, name):
+        if self.item is None:
+            return
+
+        if self.depth == 0:
+            key = item_key(self.item, self.url)
+            if self.seen is not None and key is not None and key in self.seen:
+                # Уже просмотренный элемент: описание и дату не разбираем, в очереди - только место в limit
+                self.ready.append(None)
+            else:
+                post = make_post(self.item, self.url, key)
+                if post is not None:
+                    self.ready.append(post)
+            self._reset_item()
+            return
+
+        if self.field is not None and self.depth == self.field_depth:
+            self.item[self.field] = ''.join(self.text)
+            self.field = None
+        self.depth -= 1
+
+    def _data(self, data):
+        if self.field is not None:
+            self.text.append(data)
+
+    def _entity(self, name, is_parameter_entity):
+        if self.field is not None and not is_parameter_entity:
+            self.text.append(html.entities.html5.get(name + ';', ''))
+
+    def _take_ready(self):
+        posts = []
+        while self.ready and (self.limit is None or self.count < self.limit):
+            post = self.ready.popleft()
+            self.count += 1
+            if post is not None:
+                posts.append(post)
+        if self.limit is not None and self.count >= self.limit:
+            self.done = True
+        if self.count:
+            self.buffer = None
+        return posts
+
+    def _parse(self, data, final):
+        try:
+            self.parser.Parse(data, final)
+        except expat.ExpatError as e:
+            # Лента без декларации в cp1251: перезапускаемся, пока не отдали ни одного поста
+            if self.count == 0 and not self.ready and self.encoding is None:
+                self.encoding = 'windows-1251'
+                self._reset_item()
+                self.parser = self._create_parser(self.encoding)
+                data, self.buffer = b''.join(self.buffer), []
+                self._parse(data, final)
+            else:
+                self.error = e
+                self.done = True
+
+    def feed(self, data):
+        """Передать очередную порцию байтов, вернуть готовые посты"""
+        if self.done:
+            return []
+        if self.buffer is not None:
+            self.buffer.append(data)
+        self._parse(data, False)
+        return self._take_ready()
+
+    def close(self):
+        """Завершить разбор и вернуть оставшиеся посты"""
+        if not self.done:
+            self._parse(b'', True)
+        posts = self._take_ready()
+        self.done = True
+
+        if self.error is not None and self.count == 0:
+            raise self.error
+        return posts
+
+
+def iter_feed_items(chunks, url, limit=None, seen=None):
+    """Посты ленты по одному из последовательности порций байтов"""
+    parser = FeedParser(url, limit, seen=seen)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            break
+    yield from parser.close()
+
+
+def parse_feed(data, url, limit=None, seen=None):
+    """Потоковый разбор ленты, целиком находящейся в памяти"""
+    chunks = (data[i:i + FEED_CHUNK_SIZE] for i in range(0, len(data), FEED_CHUNK_SIZE))
+    return list(iter_feed_items(chunks, url, limit, seen))
+
+
+def parse_feed_soup(content, url, limit=None, seen=None):
+    """Прежний разбор ленты через полное дерево BeautifulSoup"""
+    # Пробуем разные кодировки
+    for encoding in ['utf-8', 'windows-1251', 'cp1251']:
+        try:
+            soup = BeautifulSoup(content, 'xml', from_encoding=encoding)
+            break
+        except:
+            continue
+    else:
+        soup = BeautifulSoup(content, 'xml')
+
+    posts = []
+
+    # Ищем items в RSS или entries в Atom
+    items = soup.find_all('item') or soup.find_all('entry')
+
+    for item in items[:limit]:
+        try:
+            fields = {}
+            for tag in FIELD_TAGS:
+                elem = item.find(tag)
+                if elem:
+                    fields[tag] = elem.get_text()
+                    if tag == 'link':
+                        fields['link_href'] = elem.get('href')
+
+            key = item_key(fields, url)
+            if seen is not None and key is not None and key in seen:
+                continue
+            post = make_post(fields, url, key)
+            if post is not None:
+                posts.append(post)
+
+        except Exception as e:
+            logging.warning(f"Ошибка парсинга элемента в {url}: {e}")
+            continue
+
+    return posts
@@ -0,0 +1,87 @@
+import re
+from config import KEYWORDS
+
+# Окончания русских слов, от длинных к коротким: ключевое слово сводится к основе
+ENDINGS = sorted([
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией',
+    'ая', 'яя', 'ое', 'ее', 'ие', 'ые', 'ой', 'ей', 'ий', 'ый', 'ом', 'ем',
+    'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ию', 'ия', 'ья', 'ье', 'ью',
+    'а', 'я', 'о', 'е', 'и', 'ы', 'у', 'ю', 'ь', 'й'
+], key=len, reverse=True)
+MIN_STEM = 3  # Основа короче не обрезается, чтобы не ловить случайные слова
+MAX_SUFFIX = 4  # Сколько букв окончания допускается после основы
+
+
+def normalize(text):
+    """Нижний регистр и ё -> е"""
+    return text.lower().replace('ё', 'е')
+
+
+def stem(word):
+    """Основа слова без окончания; аббревиатуры (ОСАГО, КБМ) не меняются"""
+    if word.isupper():
+        return normalize(word)
+    word = normalize(word)
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+class KeywordMatcher:
+    """Скомпилированный поиск всех ключевых слов категории за один проход по тексту"""
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+
+        # Длинные основы идут первыми, чтобы "страхование" не совпало как "страховая"
+        stems = sorted(
+            ((stem(keyword), keyword) for keyword in self.keywords),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self.group_keywords = [keyword for _, keyword in stems]
+        alternatives = '|'.join(
+            rf'(\b{re.escape(keyword_stem)}\w{{0,{MAX_SUFFIX}}}\b)' for keyword_stem, _ in stems
+        )
+        self.pattern = re.compile(alternatives) if stems else None
+
+    def find(self, text, normalized=False):
+        """Все совпадения в тексте: список (ключевое слово, начало, конец);
+        normalized - текст уже приведен normalize() (например, PostRecord.normalized)"""
+        if self.pattern is None:
+            return []
+        return [
+            (self.group_keywords[match.lastindex - 1], match.start(), match.end())
+            for match in self.pattern.finditer(text if normalized else normalize(text))
+        ]
+
+    def match(self, text, normalized=False):
+        """Позиции совпадений по каждому найденному ключевому слову"""
+        matches = {}
+        for keyword, start, end in self.find(text, normalized):
+            matches.setdefault(keyword, []).append((start, end))
+        return matches
+
+    def search(self, text, normalized=False):
+        """Есть ли в тексте хотя бы одно ключевое слово"""
+        return self.pattern is not None and self.pattern.search(text if normalized else normalize(text)) is not None
+
+    def search_batch(self, texts, normalized=False):
+        """search() для списка текстов за один вызов"""
+        if self.pattern is None:
+            return [False] * len(texts)
+        search = self.pattern.search
+        return [search(text if normalized else normalize(text)) is not None for text in texts]
+
+
+_matchers = {}
+
+
+def get_matcher(content_type):
+    """Матчер категории, собранный один раз из config.KEYWORDS"""
+    matcher = _matchers.get(content_type)
+    if matcher is None:
+        matcher = KeywordMatcher(KEYWORDS.get(content_type, []))
+        _matchers[content_type] = matcher
+    return matcher
@@ -1,27 +1,55 @@
+import time
+
+STARTED_AT = time.perf_counter()  # Отсчет времени запуска - до импорта остальных модулей
+
+import argparse
 import asyncio
 import logging
 import os
 import random
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime, timedelta, timezone
 
-from content_aggregator import ContentAggregator
-from content_verifier import ContentVerifier
-from telegram_poster import TelegramPoster
+from config import (CHANNELS, METRICS_HOST, METRICS_PORT, PREFETCH_INTERVAL,
+                    CANDIDATE_POOL_PICK, CANDIDATE_POOL_MAX_AGE, RANK_TOP_K, FAST_START, FAST_START_DELAY,
+                    PIPELINE_GOOD_ENOUGH, PIPELINE_DEADLINE, PUBLISHED_RETENTION, MAINTENANCE_CRON)
 from database import Database
+from metrics import MetricsServer, RunSummary, metrics
+from pipeline import buffered, verify_stage, dedup_stage, select_stage
+from scheduler import Scheduler
+from worker_pool import shutdown_pool
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-class AutoInsiderAgent:
+class RecordingPoster:
+    """Публикация без Telegram: пост только записывается (воспроизведение архива)"""
+    
     def __init__(self):
-        self.db = Database()
-        self.aggregator = ContentAggregator()
-        self.verifier = ContentVerifier()
-        self.poster = TelegramPoster()
-        self.scheduler = AsyncIOScheduler()
+        self.posts = []
+        
+    async def post_to_channel(self, post, content_type, channel):
+        self.posts.append((channel['id'], content_type, post))
+        logging.info(f"📝 [{channel['id']}/{content_type}] {post['title']} - {post['link']}")
+        return True
+        
+    async def close(self):
+        pass
+
+class AutoInsiderAgent:
+    def __init__(self, db=None):
+        # Компоненты создаются при первом обращении: до первого сбора или публикации
+        # не импортируются aiohttp, bs4 и python-telegram-bot
+        self._db = db
+        self._aggregator = None
+        self._verifier = None
+        self._poster = None
+        self.scheduler = Scheduler(lambda: self.db)
+        self.metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
         
         # Резервный контент на случай недоступности источников
         self.fallback_content = {
@@ -51,115 +79,401 @@ class AutoInsiderAgent:
             ]
         }
 
-    async def collect_and_post_insurance(self):
-        await self.collect_and_post("insurance")
-        
-    async def collect_and_post_laws(self):
-        await self.collect_and_post("laws")
-        
-    async def collect_and_post_humor(self):
-        await self.collect_and_post("humor")
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = Database()
+        return self._db
 
-    async def collect_and_post(self, content_type):
-        """Основной метод сбора и публикации контента"""
-        try:
-            logging.info(f"🔄 Начинаем сбор контента для {content_type}")
-            
-            # Сбор контента
-            raw_content = await self.aggregator.fetch_content(content_type)
-            
-            if not raw_content:
-                logging.warning("❌ Не удалось собрать контент, используем резервный")
-                raw_content = self.fallback_content.get(content_type, [])
-            
-            if not raw_content:
-                logging.error("❌ Нет контента для публикации")
-                return
+    @property
+    def aggregator(self):
+        if self._aggregator is None:
+            from content_aggregator import ContentAggregator
+            self._aggregator = ContentAggregator(self.db)
+        return self._aggregator
+
+    @property
+    def verifier(self):
+        if self._verifier is None:
+            from content_verifier import ContentVerifier
+            self._verifier = ContentVerifier()
+        return self._verifier
 
-            # Проверка и фильтрация
-            verified_content = await self.verifier.verify_content(raw_content, content_type)
+    @property
+    def poster(self):
+        if self._poster is None:
+            from telegram_poster import TelegramPoster
+            self._poster = TelegramPoster(self.db)
+        return self._poster
+
+    async def live_batches(self, content_type, channel, summary):
+        """Порции постов из источников канала по мере загрузки; если не пришло ни одного - резервный контент"""
+        # Ленты общие для всех каналов и повторно не загружаются
+        own_sources = channel.get('sources', {}).get(content_type)
+        fetched = 0
+        async for posts in self.aggregator.stream_content(content_type, own_sources):
+            fetched += len(posts)
+            summary.add('fetched', len(posts))
+            yield posts
             
-            if not verified_content:
-                logging.warning("⚠️ Не найдено проверенного контента, используем первый доступный")
-                verified_content = raw_content[:1]  # Берем первый пост
+        if not fetched:
+            logging.warning("❌ Не удалось собрать контент, используем резервный")
+            fallback = self.fallback_content.get(content_type, [])
+            summary.count('fallback', len(fallback))
+            if fallback:
+                yield fallback
+
+    async def collect_live(self, content_type, channel, summary):
+        """Сбор прямо сейчас (если пул кандидатов пуст): источники, проверка и отсев повторов работают
+        потоком, а выбор останавливает их, как только найден достаточно хороший кандидат"""
+        fetched = buffered(self.live_batches(content_type, channel, summary))
+        verified = buffered(verify_stage(self.verifier, fetched, content_type, summary))
+        unposted = buffered(dedup_stage(self.db, verified, channel['id'], summary))
+        with summary.stage('live'):
+            return await select_stage(
+                unposted, self.verifier.ranker(content_type), RANK_TOP_K,
+                PIPELINE_GOOD_ENOUGH, PIPELINE_DEADLINE
+            )
 
-            logging.info(f"✅ Для публикации доступно {len(verified_content)} материалов")
+    async def rank_unposted(self, candidates, content_type, channel_id):
+        """Неопубликованные кандидаты по убыванию оценки; на повторы проверяются только RANK_TOP_K лучших"""
+        ranked = self.verifier.rank_posts(candidates, content_type, RANK_TOP_K)
+        # Проверяем, не публиковали ли уже (один запрос на весь список)
+        unposted = await self.db.filter_unposted(ranked, channel_id)
+        # Та же новость из другого источника под другим заголовком
+        unposted = await self.db.filter_near_duplicates(unposted, channel_id)
+        
+        if not unposted and len(candidates) > len(ranked):
+            # Все лучшие уже публиковались - проверяем остальных
+            top = {id(post) for post in ranked}
+            rest = [post for post in candidates if id(post) not in top]
+            unposted = await self.db.filter_unposted(rest, channel_id)
+            unposted = await self.db.filter_near_duplicates(unposted, channel_id)
+            unposted = self.verifier.rank_posts(unposted, content_type, RANK_TOP_K)
+        return unposted
+
+    async def collect_and_post(self, content_type, channel=None):
+        """Основной метод сбора и публикации контента в канал (по умолчанию - первый из CHANNELS)"""
+        channel = channel or CHANNELS[0]
+        channel_id = channel['id']
+        summary = RunSummary(content_type, channel_id)
+        result = 'error'
+        try:
+            logging.info(f"🔄 Начинаем сбор контента для {content_type} в {channel_id}")
             
+            # Кандидаты уже собраны и проверены фоновой предзагрузкой; без них - сбор на месте
+            with summary.stage('pool'):
+                verified_content = await self.db.get_candidates(content_type, channel_id, CANDIDATE_POOL_PICK)
+            summary.count('pooled', len(verified_content))
+            
+            unposted_content = []
             if verified_content:
-                # Выбор лучшего поста
-                best_post = self.verifier.select_best_post(verified_content)
+                logging.info(f"✅ Для публикации доступно {len(verified_content)} материалов")
+                
+                # Лучшие по оценке неопубликованные кандидаты, остальные - запасные к первому
+                with summary.stage('select'):
+                    unposted_content = await self.rank_unposted(verified_content, content_type, channel_id)
+                summary.count('unposted', len(unposted_content))
                 
-                # Проверяем, не публиковали ли уже
-                if not self.db.is_posted(best_post['title'], best_post['source']):
-                    # Публикация
-                    success = await self.poster.post_to_channel(best_post, content_type)
+            if not unposted_content:
+                if verified_content:
+                    logging.info("♻️ Все кандидаты пула уже публиковались или повторяют опубликованное, собираем контент сейчас")
+                else:
+                    logging.info("📭 Пул кандидатов пуст, собираем контент сейчас")
+                unposted_content = await self.collect_live(content_type, channel, summary)
+                if not summary.data['counts'].get('fetched') and not summary.data['counts'].get('fallback'):
+                    logging.error("❌ Нет контента для публикации")
+                    result = 'empty'
+                    return
                     
-                    if success:
-                        await self.db.save_post(best_post, content_type)
-                        logging.info(f"✅ Успешно опубликован пост: {best_post['title'][:50]}...")
-                    else:
-                        logging.error("❌ Ошибка публикации поста")
+            if unposted_content:
+                best_post = unposted_content[0]
+                
+                # Публикация
+                with summary.stage('post'):
+                    success = await self.poster.post_to_channel(best_post, content_type, channel)
+                
+                if success:
+                    await self.db.save_post(best_post, content_type, channel_id)
+                    logging.info(f"✅ Успешно опубликован пост: {best_post['title'][:50]}...")
+                    result = 'posted'
                 else:
-                    logging.info("⚠️ Пост уже был опубликован ранее, пропускаем")
+                    logging.error("❌ Ошибка публикации поста")
+                    result = 'failed'
             else:
-                logging.error("❌ Не удалось найти подходящий контент для публикации")
+                logging.info("⚠️ Все материалы уже были опубликованы ранее, пропускаем")
+                result = 'duplicate'
                 
         except Exception as e:
             logging.error(f"❌ Ошибка в процессе публикации: {e}")
+        finally:
+            summary.finish(result)
 
-    def setup_schedule(self):
-        """Настройка расписания"""
-        # Понедельник 9:00 MSK - Страхование
-        self.scheduler.add_job(
-            self.collect_and_post_insurance,
-            CronTrigger(day_of_week='mon', hour=6, minute=0),  # 9:00 MSK = 6:00 UTC
-            id='monday_insurance'
+    async def prefetch(self):
+        """Фоновый сбор: проверенные неопубликованные кандидаты каждого канала и категории в пул"""
+        targets = [
+            (channel, content_type)
+            for channel in CHANNELS
+            for content_type in dict.fromkeys(rule['content_type'] for rule in channel['schedule'])
+        ]
+        # Общие для категорий и каналов ленты загружаются один раз
+        contents = await self.aggregator.fetch_all(
+            [(content_type, channel.get('sources', {}).get(content_type)) for channel, content_type in targets],
+            planned=True
         )
+        complete = True
+        for (channel, content_type), raw_content in zip(targets, contents):
+            try:
+                verified_content = await self.verifier.verify_content(raw_content, content_type)
+                candidates = await self.db.filter_unposted(verified_content, channel['id'])
+                candidates = await self.db.filter_near_duplicates(candidates, channel['id'])
+                scores = self.verifier.score_batch(candidates, content_type)
+                await self.db.add_candidates(candidates, scores, content_type, channel['id'])
+                logging.info(f"🗃️ В пул {channel['id']}/{content_type} добавлено {len(candidates)} кандидатов")
+            except Exception as e:
+                complete = False
+                logging.error(f"❌ Ошибка предзагрузки {channel['id']}/{content_type}: {e}")
+        # Новые элементы лент становятся просмотренными, только когда все категории их проверили
+        if complete:
+            await self.aggregator.seen.commit()
+        await self.db.prune_candidates(CANDIDATE_POOL_MAX_AGE)
+
+    async def resume_outbox(self):
+        """Досылка сообщений, не отправленных до перезапуска"""
+        await self.poster.start()
         
-        # Среда 9:00 MSK - Законы
+    async def maintain(self):
+        """Обслуживание БД: удаление записей старше PUBLISHED_RETENTION и сжатие файла"""
+        removed = await self.db.prune_published(PUBLISHED_RETENTION)
+        freed = await self.db.compact()
+        logging.info(f"🧹 Обслуживание БД: удалено {removed} старых публикаций, освобождено {freed} страниц")
+
+    def setup_schedule(self, warm_up_at=None):
+        """Настройка расписания всех каналов из config.CHANNELS и фоновой предзагрузки;
+        warm_up_at - время первого сбора и досылки очереди (по умолчанию сразу)"""
+        if warm_up_at is not None:
+            self.scheduler.add_job(self.resume_outbox, DateTrigger(warm_up_at), id='resume_outbox',
+                                   persistent=False)
+        # Предзагрузка не хранит расписание: после перезапуска она и так выполняется сразу
         self.scheduler.add_job(
-            self.collect_and_post_laws,
-            CronTrigger(day_of_week='wed', hour=6, minute=0),
-            id='wednesday_laws'
+            self.prefetch,
+            IntervalTrigger(seconds=PREFETCH_INTERVAL),
+            id='prefetch',
+            next_run_time=warm_up_at or datetime.now(timezone.utc),
+            persistent=False
         )
+        for channel in CHANNELS:
+            for index, rule in enumerate(channel['schedule']):
+                self.scheduler.add_job(
+                    self.collect_and_post,
+                    CronTrigger(**rule['cron']),  # Время в UTC: 6:00 UTC = 9:00 MSK
+                    args=[rule['content_type'], channel],
+                    id=f"{channel['id']}:{rule['content_type']}:{index}"
+                )
+        self.scheduler.add_job(self.maintain, CronTrigger(**MAINTENANCE_CRON), id='maintenance')
+
+    async def replay(self, store, start=None, end=None):
+        """Прогон collect_and_post по архиву сырых ответов без сети: в каждый момент расписания каналов
+        между start и end (по умолчанию - весь архив) источники отвечают последним сохраненным ответом"""
+        from content_aggregator import ContentAggregator
+        from snapshot_store import ReplaySession
+        from source_health import SourceHealth
         
-        # Пятница 9:00 MSK - Юмор
-        self.scheduler.add_job(
-            self.collect_and_post_humor,
-            CronTrigger(day_of_week='fri', hour=6, minute=0),
-            id='friday_humor'
+        session = ReplaySession(store)
+        first, last = session.time_range()
+        start = start or first
+        end = end or last
+        if start is None:
+            logging.error(f"❌ Архив {store.root} пуст")
+            return []
+        self._aggregator = ContentAggregator(self.db, session=session)
+        if self._poster is None:
+            self._poster = RecordingPoster()
+        
+        runs = []
+        for channel in CHANNELS:
+            for rule in channel['schedule']:
+                trigger = CronTrigger(**rule['cron'])
+                fire_time = trigger.get_next_fire_time(None, start)
+                while fire_time is not None and fire_time <= end:
+                    runs.append((fire_time, rule['content_type'], channel))
+                    fire_time = trigger.get_next_fire_time(fire_time, fire_time + timedelta(microseconds=1))
+        if not runs:
+            # Архив короче интервала расписания: один прогон всех правил на момент end
+            runs = [(end, rule['content_type'], channel) for channel in CHANNELS for rule in channel['schedule']]
+        runs.sort(key=lambda run: run[0])
+        
+        logging.info(f"⏪ Воспроизведение архива {store.root}: {len(runs)} запусков с {start:%Y-%m-%d %H:%M} по {end:%Y-%m-%d %H:%M} UTC")
+        for fire_time, content_type, channel in runs:
+            # Каждый запуск видит архив и время на свой момент; выключатели и снимки лент не переносятся
+            session.at = fire_time.timestamp()
+            self.verifier.now = fire_time.timestamp()
+            self.aggregator.snapshots.clear()
+            self.aggregator.health = SourceHealth()
+            logging.info(f"⏪ {fire_time:%Y-%m-%d %H:%M} UTC: {channel['id']}/{content_type}")
+            await self.collect_and_post(content_type, channel)
+
+    def describe_schedule(self):
+        """Расписание для лога"""
+        return "; ".join(
+            f"{channel['id']}: " + ", ".join(
+                f"{rule['content_type']} ({' '.join(f'{key}={value}' for key, value in rule['cron'].items())})"
+                for rule in channel['schedule']
+            )
+            for channel in CHANNELS
         )
 
     async def run(self):
         """Запуск агента"""
         logging.info("🚀 Запуск агента АвтоИнсайдера...")
         
-        # Проверяем подключение к Telegram
-        try:
-            test_success = await self.poster.test_connection()
-            if not test_success:
-                logging.error("❌ Не удалось подключиться к Telegram")
+        if FAST_START:
+            # Быстрый старт: без проверки Telegram и тестовой публикации, сбор и досылка - через FAST_START_DELAY
+            self.setup_schedule(datetime.now(timezone.utc) + timedelta(seconds=FAST_START_DELAY))
+        else:
+            # Проверяем подключение к Telegram
+            try:
+                test_success = await self.poster.test_connection()
+                if not test_success:
+                    logging.error("❌ Не удалось подключиться к Telegram")
+                    return
+            except Exception as e:
+                logging.error(f"❌ Ошибка подключения к Telegram: {e}")
                 return
-        except Exception as e:
-            logging.error(f"❌ Ошибка подключения к Telegram: {e}")
-            return
         
-        # Настройка расписания
-        self.setup_schedule()
-        self.scheduler.start()
+            # Досылаем сообщения, не отправленные до перезапуска
+            await self.poster.start()
+            self.setup_schedule()
+            
+        if self.metrics_server:
+            await self.metrics_server.start()
+            
+        await self.scheduler.start()
+        startup = time.perf_counter() - STARTED_AT
+        metrics.observe('startup_seconds', startup)
+        logging.info(f"⚡ Агент готов к работе за {startup * 1000:.0f} мс")
         
-        # Тестовая публикация при запуске
-        logging.info("🧪 Тестовый запуск...")
-        await self.collect_and_post("insurance")
+        if not FAST_START:
+            # Тестовая публикация при запуске
+            logging.info("🧪 Тестовый запуск...")
+            await self.collect_and_post("insurance")
         
         logging.info("⏰ Агент запущен. Ожидание расписания...")
-        logging.info("📅 Расписание: ПН 9:00 - Страхование, СР 9:00 - Законы, ПТ 9:00 - Юмор (по МСК)")
+        logging.info(f"📅 Расписание (UTC): {self.describe_schedule()}")
         
         # Бесконечный цикл
-        while True:
-            await asyncio.sleep(3600)  # Проверка каждый час
+        try:
+            while True:
+                await asyncio.sleep(3600)  # Проверка каждый час
+        finally:
+            await self.scheduler.shutdown()
+            if self.metrics_server:
+                await self.metrics_server.stop()
+            await self.close()
+            
+    async def close(self):
+        """Закрытие созданных компонентов: очередей отправки, HTTP-сессии, пула разбора и БД"""
+        if self._poster is not None:
+            await self._poster.close()
+        if self._aggregator is not None:
+            await self._aggregator.close()
+        shutdown_pool()
+        if self._db is not None:
+            self._db.close()
+
+def parse_utc(value):
+    """Время из командной строки; без часового пояса - UTC"""
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def report_dry_run(stub, elapsed):
+    """Итоги пробного прогона: результаты запусков, время этапов и ответы заглушки"""
+    results = ", ".join(f"{dict(labels)['result']}={count}" for labels, count in metrics.samples('runs_total').items())
+    logging.info(f"📊 Пробный прогон за {elapsed:.2f} с: {results}")
+    for name, label in (('stage_seconds', 'stage'), ('telegram_send_seconds', 'chat'), ('post_seconds', 'chat')):
+        for labels, (count, total, peak) in sorted(metrics.samples(name).items()):
+            logging.info(f"⏱️ {name} {dict(labels)[label]}: {count} раз, среднее {total / count * 1000:.1f} мс, "
+                         f"максимум {peak * 1000:.1f} мс")
+    logging.info(f"📨 Заглушка: принято {len(stub.messages)} сообщений ({len(stub.messages) / elapsed:.2f} в секунду), "
+                 f"ответы: {stub.responses}")
+
+async def dry_run(args):
+    """Пробный прогон collect_and_post от сбора до публикации в локальную заглушку Bot API вместо Telegram"""
+    from snapshot_store import SnapshotStore
+    from telegram_poster import TelegramPoster
+    from telegram_stub import TelegramStubServer
+    
+    stub = await TelegramStubServer(latency=args.latency, error_rate=args.error_rate, flood_rate=args.flood_rate,
+                                    chat_limit=args.chat_limit).start()
+    # Отдельная БД в памяти: пробный прогон не трогает историю публикаций
+    agent = AutoInsiderAgent(Database(':memory:'))
+    agent._poster = TelegramPoster(agent.db, base_url=stub.base_url)
+    started = time.perf_counter()
+    try:
+        if not await agent.poster.test_connection():
+            return
+        if args.replay:
+            await agent.replay(SnapshotStore(args.replay), args.start, args.end)
+        else:
+            for _ in range(args.runs):
+                # Правила всех каналов - одновременно, как совпавшие по времени задания расписания
+                await asyncio.gather(*(
+                    agent.collect_and_post(rule['content_type'], channel)
+                    for channel in CHANNELS for rule in channel['schedule']
+                ))
+        report_dry_run(stub, time.perf_counter() - started)
+    finally:
+        await agent.close()
+        await stub.stop()
+
+async def search(args):
+    """Поиск по опубликованным постам из командной строки (писали ли мы уже о ...?)"""
+    db = Database()
+    try:
+        started = time.perf_counter()
+        posts = await db.search_posts(args.search, args.type, args.channel, args.start, args.end, args.limit)
+        elapsed = time.perf_counter() - started
+        for post in posts:
+            logging.info(f"🔎 {post['published_at']} [{post['channel_id']}/{post['content_type']}] {post['title']}")
+        logging.info(f"🔎 Найдено {len(posts)} публикаций за {elapsed * 1000:.1f} мс")
+    finally:
+        db.close()
 
 async def main():
+    parser = argparse.ArgumentParser(description="АвтоИнсайдер")
+    parser.add_argument('--replay', metavar='DIR', help="прогнать сбор и отбор по архиву сырых ответов без сети")
+    parser.add_argument('--from', dest='start', type=parse_utc, help="начало периода воспроизведения или поиска (UTC)")
+    parser.add_argument('--to', dest='end', type=parse_utc, help="конец периода воспроизведения или поиска (UTC)")
+    parser.add_argument('--search', metavar='QUERY', help="найти опубликованные посты со всеми словами запроса")
+    parser.add_argument('--type', help="категория для --search")
+    parser.add_argument('--channel', help="канал для --search")
+    parser.add_argument('--limit', type=int, default=20, help="сколько публикаций показать (--search)")
+    parser.add_argument('--dry-run', action='store_true', help="публиковать в локальную заглушку Bot API вместо Telegram")
+    parser.add_argument('--runs', type=int, default=1, help="сколько раз запустить все правила расписания (--dry-run)")
+    parser.add_argument('--latency', type=float, default=0.05, help="задержка ответа заглушки, с")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="доля ответов 500 заглушки")
+    parser.add_argument('--flood-rate', type=float, default=0.0, help="доля случайных ответов 429 заглушки")
+    parser.add_argument('--chat-limit', type=int, default=20, help="сообщений в минуту в чат до ответа 429 (0 - без лимита)")
+    args = parser.parse_args()
+    
+    if args.search:
+        await search(args)
+        return
+        
+    if args.dry_run:
+        await dry_run(args)
+        return
+        
+    if args.replay:
+        from snapshot_store import SnapshotStore
+        # Отдельная БД в памяти: воспроизведение не трогает историю публикаций
+        agent = AutoInsiderAgent(Database(':memory:'))
+        try:
+            await agent.replay(SnapshotStore(args.replay), args.start, args.end)
+        finally:
+            await agent.close()
+        return
+        
     # Проверяем наличие токена
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not token or token == "your_bot_token_here":
@@ -0,0 +1,170 @@
+from collections import deque
+from contextlib import contextmanager
+import json
+import logging
+import time
+
+# Счетчики и замеры времени этапов конвейера. Отдаются в текстовом формате Prometheus
+# на локальном порту (METRICS_PORT) и сводкой по каждому запуску сбора в JSON
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+class Metrics:
+    """Реестр метрик: счетчики (inc) и суммы наблюдений count/sum/max (observe)"""
+    
+    def __init__(self, prefix='autoinsider', runs_limit=50):
+        self.prefix = prefix
+        self.counters = {}
+        self.summaries = {}
+        self.help = {}
+        self.runs = deque(maxlen=runs_limit)
+        
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+        
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        summary = self.summaries.get(key)
+        if summary is None:
+            summary = self.summaries[key] = [0, 0.0, 0.0]
+        summary[0] += 1
+        summary[1] += value
+        summary[2] = max(summary[2], value)
+        
+    @contextmanager
+    def timer(self, name, **labels):
+        """Замер длительности блока в секундах"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+            
+    def samples(self, name):
+        """Значения метрики по наборам меток: у счетчика - число, у наблюдений - (count, sum, max)"""
+        if any(item_name == name for item_name, _ in self.counters):
+            return {labels: value for (item_name, labels), value in self.counters.items() if item_name == name}
+        return {labels: tuple(value) for (item_name, labels), value in self.summaries.items() if item_name == name}
+        
+    def describe(self, name, text):
+        self.help[name] = text
+        
+    def render(self):
+        """Текстовый формат Prometheus (exposition format 0.0.4); максимум - отдельной метрикой-gauge"""
+        lines = []
+        families = [
+            ('counter', '', self.counters, lambda value: [('', value)]),
+            ('summary', '', self.summaries, lambda value: [('_count', value[0]), ('_sum', value[1])]),
+            ('gauge', '_max', self.summaries, lambda value: [('', value[2])]),
+        ]
+        for kind, suffix, items, samples in families:
+            for name in sorted({name for name, _ in items}):
+                full = f'{self.prefix}_{name}{suffix}'
+                if name in self.help:
+                    lines.append(f'# HELP {full} {self.help[name]}' + (' (максимум)' if suffix else ''))
+                lines.append(f'# TYPE {full} {kind}')
+                for (item_name, labels), value in sorted(items.items()):
+                    if item_name == name:
+                        lines.extend(f'{full}{sample}{_labels(labels)} {number}' for sample, number in samples(value))
+        return '\n'.join(lines) + '\n'
+        
+    def add_run(self, summary):
+        self.runs.append(summary)
+        logging.info(f"📊 Сводка запуска: {json.dumps(summary, ensure_ascii=False)}")
+
+metrics = Metrics()
+metrics.describe('fetch_seconds', 'Время запроса к источнику, с')
+metrics.describe('fetch_bytes', 'Размер ответа источника, байт')
+metrics.describe('fetch_requests_total', 'Запросы к источникам по статусу ответа')
+metrics.describe('feed_items_new_total', 'Новые (еще не просмотренные) элементы лент')
+metrics.describe('poll_deferred_total', 'Источники, не загруженные при предзагрузке: срок опроса не подошел')
+metrics.describe('parse_seconds', 'Время разбора ленты или страницы, с')
+metrics.describe('verify_seconds', 'Время проверки партии кандидатов, с')
+metrics.describe('verify_rejected_total', 'Отсеянные кандидаты по правилу проверки')
+metrics.describe('verify_passed_total', 'Кандидаты, прошедшие проверку')
+metrics.describe('db_query_seconds', 'Время запроса к БД (с ожиданием потока БД), с')
+metrics.describe('telegram_send_seconds', 'Время вызова sendMessage, с')
+metrics.describe('telegram_errors_total', 'Ошибки Telegram по типу')
+metrics.describe('post_seconds', 'Время публикации поста с учетом очереди отправки, с')
+metrics.describe('stage_seconds', 'Время этапов запуска сбора, с')
+metrics.describe('runs_total', 'Запуски сбора по результату')
+metrics.describe('startup_seconds', 'Время запуска агента до готовности расписания, с')
+
+class RunSummary:
+    """Сводка одного запуска сбора: время этапов, количества и результат"""
+    
+    def __init__(self, content_type, channel_id):
+        self.data = {
+            'content_type': content_type,
+            'channel': channel_id,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'stages': {},
+            'counts': {},
+            'result': None,
+        }
+        self.start = time.perf_counter()
+        
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.data['stages'][name] = round(self.data['stages'].get(name, 0) + elapsed, 4)
+            metrics.observe('stage_seconds', elapsed, stage=name)
+            
+    def count(self, name, value):
+        self.data['counts'][name] = value
+        
+    def add(self, name, value):
+        self.data['counts'][name] = self.data['counts'].get(name, 0) + value
+        
+    def finish(self, result):
+        self.data['result'] = result
+        self.data['duration'] = round(time.perf_counter() - self.start, 4)
+        metrics.inc('runs_total', result=result)
+        metrics.add_run(self.data)
+        return self.data
+
+class MetricsServer:
+    """Локальный HTTP-сервер: /metrics (Prometheus) и /runs (последние сводки в JSON)"""
+    
+    def __init__(self, host, port, registry=metrics):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.runner = None
+        
+    async def handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(body=self.registry.render().encode('utf-8'),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+                            
+    async def handle_runs(self, request):
+        from aiohttp import web
+        return web.json_response(list(self.registry.runs), dumps=lambda data: json.dumps(data, ensure_ascii=False))
+        
+    async def start(self):
+        # aiohttp импортируется только при включенных метриках
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        app.router.add_get('/runs', self.handle_runs)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logging.info(f"📈 Метрики доступны на http://{self.host}:{self.port}/metrics")
+        return self
+        
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
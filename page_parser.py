@@ -0,0 +1,194 @@
+from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+from post_record import PostRecord
+import codecs
+import re
+
+PAGE_CHUNK_SIZE = 16 * 1024  # Размер порции байтов для потокового разбора страницы
+SUMMARY_LENGTH = 200  # Длина краткого содержания, символов
+
+# Как и в прежнем разборе через BeautifulSoup: эти элементы выбрасываются вместе с текстом
+SKIP_TAGS = ('script', 'style', 'nav', 'header', 'footer')
+# Области основного контента в порядке приоритета
+REGIONS = ('article', 'content', 'main', 'body')
+CONTENT_CLASS_RE = re.compile('content|article|post|main')
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+def make_page_post(title, text, url):
+    """Пост веб-страницы (тот же формат, что и у прежнего разбора)"""
+    if text is not None:
+        summary = text[:SUMMARY_LENGTH] + "..." if len(text) > SUMMARY_LENGTH else text
+    else:
+        summary = "Читайте полную статью по ссылке"
+    return PostRecord(title.strip() if title is not None else "Без заголовка", url, summary, source=url)
+
+class _PageExtractor(HTMLParser):
+    """Собирает заголовок и не больше SUMMARY_LENGTH + 1 символов текста каждой области контента"""
+    
+    def __init__(self):
+        super().__init__()
+        self.title = None
+        self.in_title = False
+        self.title_done = False
+        self.skip = []
+        # Область -> [тег, глубина вложенности одноименных тегов, текст]; берется первое вхождение, как в find()
+        self.regions = {}
+        self.open_regions = []
+        
+    def region_for(self, tag, attrs):
+        if tag in ('article', 'main', 'body'):
+            return tag
+        if tag == 'div':
+            classes = (dict(attrs).get('class') or '').split()
+            if any(CONTENT_CLASS_RE.search(name) for name in classes):
+                return 'content'
+        return None
+        
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip.append(tag)
+            return
+        if self.skip:
+            return
+            
+        if tag == 'title' and self.title is None:
+            self.in_title = True
+            self.title = ''
+        elif tag == 'body':
+            # Заголовок ищем только в <head>
+            self.title_done = True
+            
+        for region in self.open_regions:
+            if self.regions[region][0] == tag:
+                self.regions[region][1] += 1
+        region = self.region_for(tag, attrs)
+        if region is not None and region not in self.regions:
+            self.regions[region] = [tag, 1, '']
+            self.open_regions.append(region)
+            
+    def handle_endtag(self, tag):
+        if self.skip:
+            if tag in self.skip:
+                # Незакрытые вложенные элементы закрываются вместе с внешним
+                del self.skip[len(self.skip) - 1 - self.skip[::-1].index(tag):]
+            return
+            
+        if tag == 'title' and self.in_title:
+            self.in_title = False
+            self.title_done = True
+        for region in list(self.open_regions):
+            state = self.regions[region]
+            if state[0] == tag:
+                state[1] -= 1
+                if state[1] == 0:
+                    self.open_regions.remove(region)
+                    
+    def handle_data(self, data):
+        if self.skip:
+            return
+        if self.in_title:
+            self.title += data
+        for region in self.open_regions:
+            state = self.regions[region]
+            if len(state[2]) > SUMMARY_LENGTH:
+                continue
+            # Схлопываем пробелы сразу, сохраняя признак пробела на стыке порций текста
+            text = state[2] + data
+            collapsed = ' '.join(text.split())
+            if collapsed and text[-1:].isspace():
+                collapsed += ' '
+            state[2] = collapsed
+            
+    def region_complete(self, region):
+        state = self.regions.get(region)
+        return state is not None and (region not in self.open_regions or len(state[2]) > SUMMARY_LENGTH)
+        
+    def summary(self):
+        for region in REGIONS:
+            if region in self.regions:
+                return self.regions[region][2].strip()
+        return None
+
+class PageParser:
+    """Потоковый разбор страницы: принимает байты порциями, читает не больше max_bytes и
+    останавливается, когда заголовок и краткое содержание статьи уже найдены"""
+    
+    def __init__(self, url, encoding=None, max_bytes=None):
+        self.url = url
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.done = False
+        self.decoder = None
+        self.extractor = _PageExtractor()
+        
+    def _create_decoder(self, data):
+        encoding = self.encoding
+        if encoding is None:
+            match = META_CHARSET_RE.search(data[:2048])
+            encoding = match.group(1).decode('ascii') if match else 'utf-8'
+        try:
+            return codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')(errors='replace')
+            
+    def feed(self, data):
+        """Передать очередную порцию байтов"""
+        if self.done:
+            return
+        if self.max_bytes is not None:
+            data = data[:self.max_bytes - self.size]
+        self.size += len(data)
+        if self.decoder is None:
+            self.decoder = self._create_decoder(data)
+        self.extractor.feed(self.decoder.decode(data))
+        
+        extractor = self.extractor
+        if (extractor.title_done and extractor.region_complete('article')) or \
+                (self.max_bytes is not None and self.size >= self.max_bytes):
+            self.done = True
+            
+    def close(self):
+        """Завершить разбор и вернуть список из одного поста"""
+        if not self.done and self.decoder is not None:
+            self.extractor.feed(self.decoder.decode(b'', True))
+            self.extractor.close()
+        self.done = True
+        return [make_page_post(self.extractor.title, self.extractor.summary(), self.url)]
+
+def parse_page(data, url, encoding=None, max_bytes=None):
+    """Потоковый разбор страницы, целиком находящейся в памяти"""
+    parser = PageParser(url, encoding, max_bytes)
+    for start in range(0, len(data), PAGE_CHUNK_SIZE):
+        parser.feed(data[start:start + PAGE_CHUNK_SIZE])
+        if parser.done:
+            break
+    return parser.close()
+
+def parse_page_soup(data, url, encoding=None):
+    """Прежний разбор страницы через полное дерево BeautifulSoup"""
+    soup = BeautifulSoup(data, 'html.parser', from_encoding=encoding)
+    
+    # Убираем ненужные элементы
+    for element in soup(["script", "style", "nav", "header", "footer"]):
+        element.decompose()
+        
+    title = soup.find('title')
+    title_text = title.get_text().strip() if title else "Без заголовка"
+    
+    # Ищем основной контент
+    article = (soup.find('article') or
+               soup.find('div', class_=re.compile('content|article|post|main')) or
+               soup.find('main') or
+               soup.find('body'))
+               
+    if article:
+        text = article.get_text()
+        # Очищаем текст от лишних пробелов
+        text = ' '.join(text.split())
+        summary = text[:200] + "..." if len(text) > 200 else text
+    else:
+        summary = "Читайте полную статью по ссылке"
+        
+    post = PostRecord(title_text, url, summary, source=url)
+    return [post]
@@ -0,0 +1,97 @@
+from config import PIPELINE_QUEUE_SIZE
+import asyncio
+import logging
+import time
+
+# Потоковый конвейер живого сбора: источники -> проверка -> отсев повторов -> выбор.
+# Стадии - асинхронные генераторы порций постов; buffered() запускает стадию отдельной задачей
+# с очередью не больше PIPELINE_QUEUE_SIZE порций, поэтому стадии работают одновременно,
+# а память не растет с числом источников. Выбор может остановить конвейер досрочно
+
+_DONE = object()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+async def buffered(batches, maxsize=PIPELINE_QUEUE_SIZE):
+    """Стадия в отдельной задаче с ограниченной очередью; при остановке потребителя задача отменяется"""
+    queue = asyncio.Queue(maxsize)
+    
+    async def produce():
+        try:
+            async for batch in batches:
+                await queue.put(batch)
+        except Exception as e:
+            await queue.put(_Failure(e))
+        else:
+            await queue.put(_DONE)
+        finally:
+            # При отмене источник остановлен на yield: закрываем его, чтобы выполнились его finally
+            # (отмена загрузок, сохранение расписания опроса) и закрылись стадии до него
+            await batches.aclose()
+            
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        task.cancel()
+
+async def verify_stage(verifier, batches, content_type, summary):
+    """Проверка порций; если ни один пост не прошел, в конце отдается первый полученный (как и раньше)"""
+    first = None
+    passed = 0
+    async for posts in batches:
+        first = first or posts[:1]
+        verified = await verifier.verify_content(posts, content_type)
+        summary.add('verified', len(verified))
+        if verified:
+            passed += len(verified)
+            yield verified
+    if not passed and first:
+        logging.warning("⚠️ Не найдено проверенного контента, используем первый доступный")
+        yield first
+
+async def dedup_stage(db, batches, channel_id, summary):
+    """Отсев опубликованных в канале постов и их почти-дубликатов"""
+    async for posts in batches:
+        posts = await db.filter_unposted(posts, channel_id)
+        posts = await db.filter_near_duplicates(posts, channel_id)
+        summary.add('unposted', len(posts))
+        if posts:
+            yield posts
+
+async def select_stage(batches, ranker, k, good_enough=None, deadline=None):
+    """k лучших кандидатов по убыванию оценки. Выбор завершается, не дожидаясь остальных источников,
+    когда оценка лучшего не ниже good_enough или с начала прошло deadline секунд и кандидат уже есть"""
+    start = time.monotonic()
+    best = []
+    reason = 'complete'
+    iterator = batches.__aiter__()
+    try:
+        while True:
+            timeout = None
+            if best and deadline is not None:
+                timeout = max(0.0, deadline - (time.monotonic() - start))
+            try:
+                posts = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                reason = 'deadline'
+                break
+            best = ranker.top_k(best + posts, k)
+            if good_enough is not None and ranker.score(best[0]) >= good_enough:
+                reason = 'good_enough'
+                break
+    finally:
+        await iterator.aclose()
+    if best and reason != 'complete':
+        logging.info(f"⚡ Кандидат выбран досрочно ({reason}) через {time.monotonic() - start:.2f} с")
+    return best
@@ -0,0 +1,89 @@
+from config import POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_PAGE_INTERVAL, POLL_JITTER, POLL_EWMA_ALPHA, POLL_TARGET_ITEMS
+import random
+import time
+
+class FeedStats:
+    """Статистика ленты: скользящие средние новых элементов и времени между загрузками, срок следующей загрузки"""
+    
+    def __init__(self, url, items_ewma=None, seconds_ewma=None, last_fetch=None, next_fetch=0.0):
+        self.url = url
+        self.items_ewma = items_ewma
+        self.seconds_ewma = seconds_ewma
+        self.last_fetch = last_fetch
+        self.next_fetch = next_fetch
+        
+    def rate(self):
+        """Оценка частоты появления новых элементов, в секунду; None - пока нет наблюдений"""
+        if self.items_ewma is None or not self.seconds_ewma:
+            return None
+        return self.items_ewma / self.seconds_ewma
+        
+    def as_row(self):
+        return (self.url, self.items_ewma, self.seconds_ewma, self.last_fetch, self.next_fetch)
+
+class PollPlanner:
+    """Планировщик опроса источников: частые ленты загружаются чаще, редкие - реже; состояние хранится в БД"""
+    
+    def __init__(self, db=None):
+        self.db = db
+        self.feeds = {}
+        self.dirty = set()
+        self.loaded = False
+        
+    async def load(self):
+        """Загрузка сохраненного состояния (один раз)"""
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.db:
+            for row in await self.db.get_feed_schedule():
+                self.feeds[row[0]] = FeedStats(*row)
+                
+    async def save(self):
+        """Сохранение изменившихся лент"""
+        if self.db and self.dirty:
+            rows = [self.feeds[url].as_row() for url in self.dirty]
+            self.dirty.clear()
+            await self.db.save_feed_schedule(rows)
+            
+    def get(self, url):
+        stats = self.feeds.get(url)
+        if stats is None:
+            stats = self.feeds[url] = FeedStats(url)
+        return stats
+        
+    def due(self, url, now=None):
+        """Подошел ли срок загрузки ленты; новая лента загружается сразу"""
+        return (now if now is not None else time.time()) >= self.get(url).next_fetch
+        
+    def interval(self, stats, new_items):
+        """Интервал до следующей загрузки: время до появления ~POLL_TARGET_ITEMS новых элементов в пределах
+        [POLL_MIN_INTERVAL, POLL_MAX_INTERVAL], с разбросом, чтобы ленты не загружались одновременно"""
+        rate = stats.rate()
+        if new_items is None:
+            interval = POLL_PAGE_INTERVAL
+        elif rate is None:
+            interval = POLL_MIN_INTERVAL
+        elif rate <= 0:
+            interval = POLL_MAX_INTERVAL
+        else:
+            interval = min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, POLL_TARGET_ITEMS / rate))
+        return interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+        
+    def record(self, url, new_items, now=None):
+        """Учет успешной загрузки: сколько в ленте оказалось новых элементов
+        (None - у страницы нет ключей элементов, она опрашивается с постоянным интервалом)"""
+        now = now if now is not None else time.time()
+        stats = self.get(url)
+        # Первая загрузка отдает все окно ленты: по ней частоту не оценить
+        if stats.last_fetch is not None and new_items is not None:
+            elapsed = max(0.0, now - stats.last_fetch)
+            if stats.items_ewma is None:
+                stats.items_ewma = float(new_items)
+                stats.seconds_ewma = elapsed
+            else:
+                stats.items_ewma += POLL_EWMA_ALPHA * (new_items - stats.items_ewma)
+                stats.seconds_ewma += POLL_EWMA_ALPHA * (elapsed - stats.seconds_ewma)
+        stats.last_fetch = now
+        stats.next_fetch = now + self.interval(stats, new_items)
+        self.dirty.add(url)
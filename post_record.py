@@ -0,0 +1,172 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from keyword_matcher import get_matcher, normalize
+import hashlib
+import sys
+
+# Компактная запись поста вместо словаря: поля в __slots__, строка источника (одна на сотни постов ленты)
+# интернирована, производные значения (текст для поиска ключевых слов, время публикации, ключ
+# дедупликации, число ключевых слов категории) считаются один раз при первом обращении. Запись поддерживает доступ как к словарю
+# (post['title'], post.get(...), 'link' in post, dict(post)), поэтому код, работающий со словарями,
+# и словари из БД / старого кэша принимаются без изменений: as_post() превращает их в запись
+
+FIELDS = ('title', 'link', 'summary', 'published', 'published_ts', 'source', 'item_key')
+
+def parse_timestamp(value):
+    """Время публикации из RFC 822 (RSS) или ISO 8601 (Atom) в секундах эпохи; None, если не разобрать"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def make_dedup_key(title, source):
+    """Хэш пары (заголовок, источник) для индекса дедупликации"""
+    return hashlib.sha1(f"{title}\n{source}".encode('utf-8')).hexdigest()
+
+class PostRecord:
+    """Пост: заголовок, ссылка, краткое содержание, дата, источник и ключ элемента ленты"""
+    
+    __slots__ = FIELDS + ('extra', '_text', '_normalized', '_summary_lower', '_dedup_key', '_keywords')
+    
+    def __init__(self, title, link, summary, published=None, published_ts=None, source=None, item_key=None,
+                 extra=None):
+        self.title = title
+        self.link = link
+        self.summary = summary
+        self.published = published
+        self.published_ts = published_ts
+        self.source = sys.intern(source) if source is not None else None
+        self.item_key = item_key
+        self.extra = extra  # Прочие поля исходного словаря
+        self._text = None
+        self._normalized = None
+        self._summary_lower = None
+        self._dedup_key = None
+        self._keywords = None
+        
+    @classmethod
+    def from_dict(cls, data):
+        extra = {key: value for key, value in data.items() if key not in FIELDS} or None
+        return cls(*(data.get(field) for field in FIELDS), extra=extra)
+        
+    def __reduce__(self):
+        # Между процессами пула передаются только поля: источник интернируется заново, кэши не копируются
+        return (PostRecord, tuple(getattr(self, field) for field in FIELDS) + (self.extra,))
+        
+    @property
+    def text(self):
+        """Заголовок и краткое содержание - текст для ключевых слов и сравнения с опубликованным"""
+        if self._text is None:
+            self._text = f"{self.title} {self.summary}"
+        return self._text
+        
+    @property
+    def normalized(self):
+        """text в нижнем регистре с ё -> е (см. keyword_matcher.normalize)"""
+        if self._normalized is None:
+            self._normalized = normalize(self.text)
+        return self._normalized
+        
+    @property
+    def summary_lower(self):
+        if self._summary_lower is None:
+            self._summary_lower = self.summary.lower()
+        return self._summary_lower
+        
+    @property
+    def timestamp(self):
+        """Время публикации в секундах эпохи (разбирается из published при первом обращении)"""
+        if self.published_ts is None and self.published:
+            self.published_ts = parse_timestamp(self.published)
+        return self.published_ts
+        
+    @property
+    def dedup_key(self):
+        if self._dedup_key is None:
+            self._dedup_key = make_dedup_key(self.title, self.source)
+        return self._dedup_key
+        
+    def keyword_count(self, content_type):
+        """Сколько разных ключевых слов категории в тексте (проверка релевантности и ранжирование)"""
+        if self._keywords is None:
+            self._keywords = {}
+        count = self._keywords.get(content_type)
+        if count is None:
+            count = self._keywords[content_type] = len(get_matcher(content_type).match(self.normalized, normalized=True))
+        return count
+        
+    # Доступ как к словарю: ключи - заданные поля
+    
+    def keys(self):
+        keys = [field for field in FIELDS if self[field] is not None]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+        
+    def __getitem__(self, key):
+        if key == 'published_ts':
+            return self.timestamp
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+        
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, sys.intern(value) if key == 'source' and value is not None else value)
+            self._text = self._normalized = self._summary_lower = self._dedup_key = self._keywords = None
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            
+    def __contains__(self, key):
+        try:
+            return self[key] is not None
+        except KeyError:
+            return False
+            
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+        
+    def __iter__(self):
+        return iter(self.keys())
+        
+    def __len__(self):
+        return len(self.keys())
+        
+    def __eq__(self, other):
+        if isinstance(other, (PostRecord, dict)):
+            return self.as_dict() == dict(other)
+        return NotImplemented
+        
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"PostRecord({self.title!r}, {self.source!r})"
+        
+    def as_dict(self):
+        """Словарь для JSON (кэш лент, пул кандидатов, очередь отправки)"""
+        return {key: self[key] for key in self.keys()}
+
+def as_post(post):
+    """Запись поста из словаря; запись возвращается как есть"""
+    return post if isinstance(post, PostRecord) else PostRecord.from_dict(post)
+
+def as_dict(post):
+    """Словарь поста для JSON; словарь возвращается как есть"""
+    return post.as_dict() if isinstance(post, PostRecord) else post
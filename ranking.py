@@ -0,0 +1,50 @@
+from config import (RANK_RECENCY_HALF_LIFE, RANK_RECENCY_WEIGHT, RANK_KEYWORD_WEIGHT, RANK_KEYWORD_CAP,
+                    SOURCE_WEIGHTS)
+from post_record import as_post
+from urllib.parse import urlparse
+import heapq
+import time
+
+_weights = {}
+
+def source_weight(source):
+    """Вес источника из config.SOURCE_WEIGHTS по домену (поддомены наследуют вес), по умолчанию 1"""
+    weight = _weights.get(source)
+    if weight is None:
+        weight = 1.0
+        host = urlparse(source).netloc.lower() or source.lower()
+        while host:
+            if host in SOURCE_WEIGHTS:
+                weight = SOURCE_WEIGHTS[host]
+                break
+            host = host.partition('.')[2]
+        _weights[source] = weight
+    return weight
+
+class Ranker:
+    """Оценка кандидатов категории: свежесть, сила совпадения ключевых слов и вес источника"""
+    
+    def __init__(self, content_type, now=None):
+        self.content_type = content_type
+        self.now = now if now is not None else time.time()
+        
+    def score(self, post):
+        post = as_post(post)
+        timestamp = post.timestamp
+        # Свежесть убывает вдвое каждые RANK_RECENCY_HALF_LIFE секунд; пост без даты - самый старый
+        if timestamp is None:
+            recency = 0.0
+        else:
+            recency = 0.5 ** (max(0.0, self.now - timestamp) / RANK_RECENCY_HALF_LIFE)
+        keywords = min(post.keyword_count(self.content_type), RANK_KEYWORD_CAP)
+        relevance = RANK_RECENCY_WEIGHT * recency + RANK_KEYWORD_WEIGHT * keywords / RANK_KEYWORD_CAP
+        return relevance * source_weight(post.source)
+        
+    def top_k(self, posts, k):
+        """k лучших постов по убыванию оценки за O(n log k); при равенстве - более свежий, затем в исходном порядке"""
+        posts = [as_post(post) for post in posts]
+        scored = (
+            (self.score(post), post.timestamp or float('-inf'), -index, post)
+            for index, post in enumerate(posts)
+        )
+        return [item[3] for item in heapq.nlargest(k, scored, key=lambda item: item[:3])]
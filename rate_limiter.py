@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """Ведро токенов: не больше rate операций в секунду с запасом на capacity подряд"""
+    
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+    async def acquire(self):
+        """Дождаться свободного токена и забрать его"""
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+            
+    def pause(self, seconds):
+        """Не выдавать токены ближайшие seconds секунд (ответ RetryAfter от сервера)"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
@@ -1,44 +1,163 @@
 import asyncio
-from datetime import datetime, time
-from config import SCHEDULE
+from datetime import datetime, timezone
+from config import SCHEDULE_MISFIRE_GRACE, SCHEDULE_MAX_SLEEP
 import logging
 
+# Планировщик с состоянием в SQLite. Триггеры APScheduler (CronTrigger, IntervalTrigger, DateTrigger)
+# используются только для вычисления времени запусков. Время следующего запуска каждого
+# постоянного задания хранится в БД, поэтому запуск, пропущенный пока процесс не работал,
+# выполняется после перезапуска (если опоздание не больше misfire_grace_time), а запись
+# о запуске в job_runs не дает выполнить один и тот же запуск дважды. Запуск, оборванный
+# перезапуском, повторяется в тех же пределах: публикацию второй раз не отправит outbox
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+class Job:
+    """Задание: функция, триггер и время следующего запуска"""
+    
+    def __init__(self, job_id, func, trigger, args, persistent, misfire_grace_time, next_run_time):
+        self.id = job_id
+        self.func = func
+        self.trigger = trigger
+        self.args = list(args)
+        self.persistent = persistent
+        self.misfire_grace_time = misfire_grace_time
+        self.next_run_time = next_run_time
+        self.running = False
+        
+    def next_fire_after(self, previous, now):
+        """Первое время запуска после now; пропущенные запуски между ними схлопываются"""
+        next_time = self.trigger.get_next_fire_time(previous, now)
+        while next_time is not None and next_time <= now:
+            next_time = self.trigger.get_next_fire_time(next_time, now)
+        return next_time
+
 class Scheduler:
-    def __init__(self):
-        self.tasks = []
+    """Планировщик с расписанием в БД: пробуждается к ближайшему запуску, а не опрашивает часы"""
+    
+    def __init__(self, db, misfire_grace_time=SCHEDULE_MISFIRE_GRACE):
+        # БД или функция, которая ее возвращает: тогда БД открывается только в start()
+        self.db = db
+        self.misfire_grace_time = misfire_grace_time
+        self.jobs = {}
+        self.tasks = set()
+        self.wakeup = asyncio.Event()
+        self.loop_task = None
         
-    async def setup_schedule(self, callback_function):
-        """Настройка расписания публикаций"""
-        schedule_map = {
-            "monday": "insurance",
-            "wednesday": "laws", 
-            "friday": "humor"
-        }
+    def add_job(self, func, trigger, args=(), id=None, persistent=True, misfire_grace_time=None,
+                next_run_time=None):
+        """Добавление задания; persistent - хранить расписание в БД и учитывать запуски в job_runs"""
+        job_id = id or f"{func.__qualname__}:{len(self.jobs)}"
+        self.jobs[job_id] = Job(
+            job_id, func, trigger, args, persistent,
+            misfire_grace_time if misfire_grace_time is not None else self.misfire_grace_time,
+            next_run_time
+        )
+        self.wakeup.set()
+        return self.jobs[job_id]
         
-        for day, content_type in schedule_map.items():
-            task = asyncio.create_task(
-                self.daily_check(callback_function, content_type, SCHEDULE[day])
-            )
-            self.tasks.append(task)
+    async def start(self):
+        """Загрузка сохраненного расписания и запуск цикла планировщика"""
+        if callable(self.db):
+            self.db = self.db()
+        now = utcnow()
+        resumed = []
+        for job_id, scheduled_at in await self.db.interrupt_job_runs():
+            job = self.jobs.get(job_id)
+            lateness = (now - scheduled_at).total_seconds()
+            if job is None or not job.persistent or lateness > job.misfire_grace_time:
+                logging.warning(f"⚠️ Запуск {job_id} в {scheduled_at:%Y-%m-%d %H:%M} UTC прерван перезапуском "
+                                f"и повторно не выполняется")
+            else:
+                resumed.append((job, scheduled_at))
+                
+        saved = await self.db.get_job_states()
+        for job in self.jobs.values():
+            if job.next_run_time is None:
+                job.next_run_time = job.next_fire_after(None, now)
+            stored = saved.get(job.id) if job.persistent else None
+            if stored is not None and stored <= now:
+                # Время запуска наступило, пока процесс не работал: цикл выполнит его сразу
+                logging.info(f"⏪ Пропущенный запуск {job.id} в {stored:%Y-%m-%d %H:%M} UTC")
+                job.next_run_time = stored
+            if job.persistent:
+                await self.db.save_job_state(job.id, job.next_run_time, None)
+                
+        for job, scheduled_at in resumed:
+            if await self.db.resume_job_run(job.id, scheduled_at):
+                logging.info(f"🔁 Повтор прерванного запуска {job.id} в {scheduled_at:%Y-%m-%d %H:%M} UTC")
+                self.spawn(job, scheduled_at)
+                
+        self.loop_task = asyncio.create_task(self.run_loop())
+        logging.info("⏱️ Планировщик запущен")
+        
+    async def shutdown(self):
+        """Остановка цикла и ожидание выполняющихся заданий"""
+        if self.loop_task is not None:
+            self.loop_task.cancel()
+            await asyncio.gather(self.loop_task, return_exceptions=True)
+            self.loop_task = None
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
             
-    async def daily_check(self, callback, content_type, post_time):
-        """Ежедневная проверка времени публикации"""
+    async def run_loop(self):
         while True:
-            now = datetime.now()
-            
-            # Проверяем день недели и время
-            if (now.strftime("%A").lower() == list(SCHEDULE.keys())[list(SCHEDULE.values()).index(post_time)] and
-                now.time().hour == post_time.hour and
-                now.time().minute == post_time.minute):
+            now = utcnow()
+            for job in list(self.jobs.values()):
+                if job.next_run_time is not None and job.next_run_time <= now:
+                    try:
+                        await self.dispatch(job, now)
+                    except Exception as e:
+                        logging.error(f"❌ Ошибка планировщика при запуске {job.id}: {e}")
+                        
+            # Спим до ближайшего запуска или нового задания; сон ограничен на случай перевода часов
+            next_times = [job.next_run_time for job in self.jobs.values() if job.next_run_time is not None]
+            delay = SCHEDULE_MAX_SLEEP
+            if next_times:
+                delay = min(delay, max(0.0, (min(next_times) - utcnow()).total_seconds()))
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
                 
-                try:
-                    await callback(content_type)
-                    logging.info(f"Выполнена публикация для {content_type}")
-                except Exception as e:
-                    logging.error(f"Ошибка при выполнении публикации: {e}")
-                
-                # Ждем 61 минуту чтобы не запустить дважды в одну минуту
-                await asyncio.sleep(61)
-            else:
-                # Проверяем каждую минуту
-                await asyncio.sleep(60)
\ No newline at end of file
+    async def dispatch(self, job, now):
+        """Запуск задания, время которого наступило, и перенос на следующее время"""
+        scheduled_at = job.next_run_time
+        job.next_run_time = job.next_fire_after(scheduled_at, now)
+        if job.persistent:
+            await self.db.save_job_state(job.id, job.next_run_time, scheduled_at)
+            
+        lateness = (now - scheduled_at).total_seconds()
+        if lateness > job.misfire_grace_time:
+            logging.warning(f"⏭️ Запуск {job.id} в {scheduled_at:%Y-%m-%d %H:%M} UTC пропущен: опоздание {lateness:.0f} с")
+            if job.persistent:
+                await self.db.claim_job_run(job.id, scheduled_at, 'missed')
+            return
+        if job.running:
+            logging.warning(f"⏭️ Запуск {job.id} пропущен: предыдущий еще выполняется")
+            return
+        if job.persistent and not await self.db.claim_job_run(job.id, scheduled_at, 'running'):
+            logging.info(f"♻️ Запуск {job.id} в {scheduled_at:%Y-%m-%d %H:%M} UTC уже выполнялся")
+            return
+        self.spawn(job, scheduled_at)
+        
+    def spawn(self, job, scheduled_at):
+        """Выполнение захваченного запуска в отдельной задаче"""
+        task = asyncio.create_task(self.execute(job, scheduled_at))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        
+    async def execute(self, job, scheduled_at):
+        job.running = True
+        status = 'done'
+        try:
+            await job.func(*job.args)
+        except Exception as e:
+            status = 'failed'
+            logging.error(f"❌ Ошибка задания {job.id}: {e}")
+        finally:
+            job.running = False
+            if job.persistent:
+                await self.db.finish_job_run(job.id, scheduled_at, status)
@@ -0,0 +1,72 @@
+from config import SEEN_BLOOM_CAPACITY, SEEN_BLOOM_ERROR_RATE, SEEN_RETENTION
+import logging
+import math
+
+# Индекс просмотренных элементов лент: ключи (см. feed_parser.item_key) хранятся в SQLite,
+# а проверка при разборе идет по фильтру Блума в памяти, который загружается из БД при первом сборе.
+# Ложное срабатывание фильтра (не чаще SEEN_BLOOM_ERROR_RATE) пропускает новый элемент
+
+class BloomFilter:
+    """Фильтр Блума для шестнадцатеричных хэшей; позиции - двойным хэшированием по битам ключа"""
+    
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        
+    def positions(self, key):
+        first = int(key[:16], 16)
+        second = int(key[16:32], 16) | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+        
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+        
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+class SeenIndex:
+    """Просмотренные элементы лент; новые ключи копятся в pending до commit(), то есть до конца их обработки"""
+    
+    def __init__(self, db=None):
+        self.db = db
+        self.bloom = BloomFilter(SEEN_BLOOM_CAPACITY, SEEN_BLOOM_ERROR_RATE)
+        self.pending = set()
+        self.loaded = False
+        
+    async def load(self):
+        """Построение фильтра по ключам из БД (один раз); емкость - с запасом вдвое от их числа"""
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.db:
+            keys = await self.db.get_seen_keys()
+            self.bloom = BloomFilter(max(SEEN_BLOOM_CAPACITY, 2 * len(keys)), SEEN_BLOOM_ERROR_RATE)
+            for key in keys:
+                self.bloom.add(key)
+            logging.info(f"👁️ Загружено {len(keys)} просмотренных элементов лент")
+            
+    def __contains__(self, key):
+        return key in self.bloom
+        
+    def stage(self, posts):
+        """Ключи постов, полученных из лент; просмотренными они станут после commit()"""
+        self.pending.update(post['item_key'] for post in posts if post.get('item_key'))
+        
+    async def commit(self):
+        """Отметка отложенных ключей просмотренными: в фильтре и в БД"""
+        keys = list(self.pending)
+        self.pending.clear()
+        for key in keys:
+            self.bloom.add(key)
+        if self.db and keys:
+            await self.db.add_seen_keys(keys)
+            await self.db.prune_seen_keys(SEEN_RETENTION)
+        if self.bloom.count > self.bloom.capacity:
+            # Фильтр переполнен, доля ложных срабатываний растет: строим заново большего размера
+            self.loaded = False
+            await self.load()
@@ -0,0 +1,50 @@
+import hashlib
+import random
+import re
+import struct
+from keyword_matcher import stem
+
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16  # 16 полос по 4 значения: кандидатами становятся посты со сходством от ~0.5
+MINHASH_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240101)  # Фиксированное зерно: подписи должны совпадать между запусками
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+WORD_RE = re.compile(r'\w{3,}')
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+def shingles(text):
+    """Множество основ слов текста (словоформы одного слова дают одну основу)"""
+    return {stem(word) for word in WORD_RE.findall(text)}
+
+def minhash(text):
+    """MinHash-подпись текста или None для текста без слов"""
+    hashes = [_hash64(shingle.encode('utf-8')) for shingle in shingles(text)]
+    if not hashes:
+        return None
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS)
+
+def band_keys(signature):
+    """Ключи LSH-полос подписи (знаковые 64-битные, как INTEGER в SQLite)"""
+    keys = []
+    for band in range(MINHASH_BANDS):
+        rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        key = _hash64(struct.pack(f'<I{MINHASH_ROWS}Q', band, *rows))
+        keys.append(key - (1 << 64) if key >> 63 else key)
+    return keys
+
+def pack_signature(signature):
+    """Подпись в BLOB для SQLite"""
+    return struct.pack(f'<{MINHASH_PERMUTATIONS}Q', *signature)
+
+def unpack_signature(blob):
+    """Подпись из BLOB"""
+    return struct.unpack(f'<{MINHASH_PERMUTATIONS}Q', blob)
+
+def similarity(first, second):
+    """Оценка коэффициента Жаккара по двум подписям"""
+    return sum(1 for a, b in zip(first, second) if a == b) / MINHASH_PERMUTATIONS
@@ -0,0 +1,140 @@
+from datetime import datetime, timezone
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Архив сырых ответов источников для разбора инцидентов и воспроизведения без сети.
+# Тела ответов сжимаются gzip и хранятся по sha256 (blobs/ab/abcd....gz): неизменившаяся лента
+# занимает место один раз. Каждый запрос - строка в index.jsonl: url, время, статус, заголовки, хэш тела
+
+INDEX_FILE = 'index.jsonl'
+CHARSET_RE = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+class SnapshotStore:
+    """Хранилище сжатых сырых ответов с адресацией по содержимому"""
+    
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        
+    def blob_path(self, digest):
+        return os.path.join(self.root, 'blobs', digest[:2], f"{digest}.gz")
+        
+    def save(self, url, status, headers, body, fetched_at):
+        """Запись ответа; body=None - ответ без тела (304 или ошибка). Выполняется в потоке"""
+        digest = None
+        if body is not None:
+            digest = hashlib.sha256(body).hexdigest()
+            path = self.blob_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Пишем во временный файл, чтобы оборванная запись не оставила битый блоб
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(temp_path, 'wb', compresslevel=6) as file:
+                    file.write(body)
+                os.replace(temp_path, path)
+                
+        record = {
+            'url': url,
+            'fetched_at': fetched_at,
+            'status': status,
+            'headers': headers,
+            'sha256': digest,
+            'size': len(body) if body is not None else 0
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, INDEX_FILE), 'a', encoding='utf-8') as file:
+                file.write(line + '\n')
+        return record
+        
+    def records(self):
+        """Все записи журнала в порядке записи"""
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file if line.strip()]
+            
+    def load(self, digest):
+        with gzip.open(self.blob_path(digest), 'rb') as file:
+            return file.read()
+
+class ReplayContent:
+    """Тело ответа с интерфейсом response.content из aiohttp"""
+    
+    def __init__(self, body):
+        self.body = body
+        
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.body), size):
+            yield self.body[start:start + size]
+
+class ReplayResponse:
+    """Ответ из архива с той частью интерфейса aiohttp.ClientResponse, которой пользуется агрегатор"""
+    
+    def __init__(self, status, headers, body):
+        from multidict import CIMultiDict
+        self.status = status
+        self.headers = CIMultiDict(headers or {})
+        self.body = body or b''
+        self.content = ReplayContent(self.body)
+        match = CHARSET_RE.search(self.headers.get('Content-Type', ''))
+        self.charset = match.group(1) if match else None
+        
+    async def __aenter__(self):
+        return self
+        
+    async def __aexit__(self, *exc_info):
+        return False
+        
+    async def read(self):
+        return self.body
+        
+    async def text(self):
+        return self.body.decode(self.charset or 'utf-8', errors='replace')
+
+class ReplaySession:
+    """Замена aiohttp-сессии: отвечает последним сохраненным ответом источника не позже момента at"""
+    
+    closed = False
+    
+    def __init__(self, store, at=None):
+        self.store = store
+        self.at = at
+        self.history = {}
+        for record in sorted(store.records(), key=lambda record: record['fetched_at']):
+            self.history.setdefault(record['url'], []).append(record)
+        self.times = {url: [record['fetched_at'] for record in records] for url, records in self.history.items()}
+        
+    def time_range(self):
+        """Время первого и последнего сохраненного ответа (UTC)"""
+        times = [time for url_times in self.times.values() for time in url_times]
+        if not times:
+            return None, None
+        return (datetime.fromtimestamp(min(times), timezone.utc),
+                datetime.fromtimestamp(max(times), timezone.utc))
+                
+    def get(self, url, headers=None, timeout=None):
+        records = self.history.get(url, [])
+        end = len(records) if self.at is None else bisect.bisect_right(self.times.get(url, []), self.at)
+        if end == 0:
+            raise ConnectionError(f"нет сохраненного ответа для {url}")
+            
+        record = records[end - 1]
+        if record['status'] == 304:
+            # Условный запрос: отдаем последнее сохраненное тело ленты как обычный ответ
+            for previous in reversed(records[:end - 1]):
+                if previous['sha256']:
+                    return ReplayResponse(200, previous['headers'], self.store.load(previous['sha256']))
+            raise ConnectionError(f"нет сохраненного тела для {url}")
+        body = self.store.load(record['sha256']) if record['sha256'] else None
+        return ReplayResponse(record['status'], record['headers'], body)
+        
+    async def close(self):
+        pass
@@ -0,0 +1,118 @@
+from config import (HTTP_TIMEOUT, HEALTH_EWMA_ALPHA, HEALTH_FAILURE_THRESHOLD, HEALTH_OPEN_SECONDS,
+                    HEALTH_OPEN_MAX_SECONDS, HEALTH_TIMEOUT_FACTOR, HEALTH_MIN_TIMEOUT)
+from metrics import metrics
+import logging
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class SourceState:
+    """Состояние одного источника: счетчики, EWMA задержки и успешности, автомат выключателя"""
+    
+    def __init__(self, url, successes=0, failures=0, consecutive_failures=0, latency_ewma=None,
+                 success_ewma=1.0, state=CLOSED, open_until=0.0, opens=0):
+        self.url = url
+        self.successes = successes
+        self.failures = failures
+        self.consecutive_failures = consecutive_failures
+        self.latency_ewma = latency_ewma
+        self.success_ewma = success_ewma
+        self.state = state
+        self.open_until = open_until
+        self.opens = opens
+        self.probing = False
+        
+    def as_row(self):
+        return (self.url, self.successes, self.failures, self.consecutive_failures, self.latency_ewma,
+                self.success_ewma, self.state, self.open_until, self.opens)
+
+class SourceHealth:
+    """Реестр здоровья источников с автоматическими выключателями; состояние хранится в БД"""
+    
+    def __init__(self, db=None):
+        self.db = db
+        self.sources = {}
+        self.dirty = set()
+        self.loaded = False
+        
+    async def load(self):
+        """Загрузка сохраненного состояния (один раз)"""
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.db:
+            for row in await self.db.get_source_health():
+                self.sources[row[0]] = SourceState(*row)
+                
+    async def save(self):
+        """Сохранение изменившихся источников"""
+        if self.db and self.dirty:
+            rows = [self.sources[url].as_row() for url in self.dirty]
+            self.dirty.clear()
+            await self.db.save_source_health(rows)
+            
+    def get(self, url):
+        state = self.sources.get(url)
+        if state is None:
+            state = self.sources[url] = SourceState(url)
+        return state
+        
+    def allow(self, url):
+        """Можно ли обращаться к источнику; после паузы открытого выключателя пропускается один пробный запрос"""
+        state = self.get(url)
+        if state.state == CLOSED:
+            return True
+        if state.state == OPEN and time.time() >= state.open_until:
+            state.state = HALF_OPEN
+            state.probing = False
+            self.dirty.add(url)
+        if state.state == HALF_OPEN and not state.probing:
+            state.probing = True
+            logging.info(f"🩺 Пробный запрос к источнику {url}")
+            return True
+        return False
+        
+    def timeout_for(self, url):
+        """Таймаут запроса по наблюдаемой задержке источника, не больше HTTP_TIMEOUT"""
+        state = self.get(url)
+        if state.latency_ewma is None or state.state != CLOSED:
+            return HTTP_TIMEOUT
+        return min(HTTP_TIMEOUT, max(HEALTH_MIN_TIMEOUT, state.latency_ewma * HEALTH_TIMEOUT_FACTOR))
+        
+    def priority(self, url):
+        """Ключ сортировки: сначала здоровые и быстрые источники"""
+        state = self.get(url)
+        return (-state.success_ewma, state.latency_ewma or 0.0)
+        
+    def record(self, url, ok, latency):
+        """Учет результата запроса к источнику"""
+        state = self.get(url)
+        state.probing = False
+        state.success_ewma += HEALTH_EWMA_ALPHA * ((1.0 if ok else 0.0) - state.success_ewma)
+        self.dirty.add(url)
+        
+        if ok:
+            state.successes += 1
+            state.consecutive_failures = 0
+            if state.latency_ewma is None:
+                state.latency_ewma = latency
+            else:
+                state.latency_ewma += HEALTH_EWMA_ALPHA * (latency - state.latency_ewma)
+            if state.state != CLOSED:
+                logging.info(f"💚 Источник снова доступен: {url}")
+            state.state = CLOSED
+            state.opens = 0
+            return
+            
+        state.failures += 1
+        state.consecutive_failures += 1
+        if state.state == HALF_OPEN or state.consecutive_failures >= HEALTH_FAILURE_THRESHOLD:
+            # Каждое повторное открытие удваивает паузу
+            state.opens += 1
+            pause = min(HEALTH_OPEN_MAX_SECONDS, HEALTH_OPEN_SECONDS * 2 ** (state.opens - 1))
+            state.state = OPEN
+            state.open_until = time.time() + pause
+            metrics.inc('circuit_opened_total', source=url)
+            logging.warning(f"🔌 Источник {url} отключен на {pause} с после {state.consecutive_failures} ошибок подряд")
@@ -1,13 +1,29 @@
 from telegram import Bot
-from telegram.error import TelegramError
-from config import TELEGRAM_BOT_TOKEN, CHANNEL_ID
+from telegram.error import TelegramError, RetryAfter, BadRequest, Forbidden
+from config import (TELEGRAM_BOT_TOKEN, TELEGRAM_API_URL, CHANNEL_ID, TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE,
+                    TELEGRAM_MAX_RETRIES, TELEGRAM_RETRY_BASE_DELAY)
+from metrics import metrics
+from rate_limiter import TokenBucket
+import asyncio
 import logging
+import random
 
 class TelegramPoster:
-    def __init__(self):
-        self.bot = Bot(token=TELEGRAM_BOT_TOKEN)
+    def __init__(self, db=None, base_url=None):
+        # base_url - другой сервер Bot API (например, заглушка telegram_stub для пробных прогонов)
+        self.bot = Bot(token=TELEGRAM_BOT_TOKEN, base_url=base_url or TELEGRAM_API_URL)
         self.channel_id = CHANNEL_ID
         
+        # Очередь отправки: общий лимит бота и отдельная очередь с лимитом на каждый чат.
+        # С БД сообщения сохраняются в outbox и досылаются после перезапуска
+        self.db = db
+        self.global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self.chat_buckets = {}
+        self.chat_queues = {}
+        self.workers = {}
+        # id сообщений outbox, которые уже в очереди или отправляются: start() не ставит их повторно
+        self.queued = set()
+        
     async def test_connection(self):
         """Тест подключения к Telegram"""
         try:
@@ -18,8 +34,10 @@ class TelegramPoster:
             logging.error(f"❌ Ошибка подключения к Telegram: {e}")
             return False
         
-    def format_post(self, content, content_type):
-        """Форматирование поста для Telegram"""
+    def format_post(self, content, content_type, fmt=None):
+        """Форматирование поста для Telegram; fmt - оформление канала из config.CHANNELS"""
+        fmt = fmt or {}
+
         emoji_map = {
             "insurance": "🛡️",
             "laws": "⚖️", 
@@ -32,8 +50,10 @@ class TelegramPoster:
             "humor": "АВТОЮМОР ПЯТНИЦЫ"
         }
         
-        emoji = emoji_map.get(content_type, "📰")
-        title = title_map.get(content_type, "НОВАЯ СТАТЬЯ")
+        emoji = fmt.get('emoji', {}).get(content_type) or emoji_map.get(content_type, "📰")
+        title = fmt.get('titles', {}).get(content_type) or title_map.get(content_type, "НОВАЯ СТАТЬЯ")
+        footer = fmt.get('footer', "💡 Наш бот для расчета страховки: @CarInsuranceFastBot")
+        footer_block = f"{footer}\n\n" if footer else ""
         
         # Ограничение длины
         summary = content['summary'][:400] + "..." if len(content['summary']) > 400 else content['summary']
@@ -47,9 +67,7 @@ class TelegramPoster:
 🔗 <a href="{content['link']}">Читать полностью</a>
 📊 Источник: {self.get_source_name(content['source'])}
 
-💡 Наш бот для расчета страховки: @CarInsuranceFastBot
-
-#{content_type} #{self.get_source_tag(content['source'])}"""
+{footer_block}#{content_type} #{self.get_source_tag(content['source'])}"""
         
         return message
         
@@ -78,24 +96,140 @@ class TelegramPoster:
                 return domain
         return 'autonews'
         
-    async def post_to_channel(self, content, content_type):
-        """Публикация поста в канал"""
-        try:
-            message = self.format_post(content, content_type)
+    async def start(self):
+        """Возобновление отправки сообщений, не доставленных до перезапуска"""
+        if not self.db:
+            return
+        # Сообщения, поставленные в очередь после запуска (в том числе отправляемые сейчас), тоже 'pending'
+        pending = [message for message in await self.db.get_pending_outbox() if message['id'] not in self.queued]
+        if pending:
+            logging.info(f"📬 Досылаем {len(pending)} сообщений из очереди")
+        for message in pending:
+            self.enqueue(message, None)
+            
+    def enqueue(self, message, future):
+        """Постановка сообщения в очередь его чата"""
+        chat_id = message['chat_id']
+        if chat_id not in self.chat_queues:
+            self.chat_queues[chat_id] = asyncio.Queue()
+            self.chat_buckets[chat_id] = TokenBucket(TELEGRAM_CHAT_RATE)
+            self.workers[chat_id] = asyncio.create_task(self.chat_worker(chat_id))
+        if message.get('id') is not None:
+            self.queued.add(message['id'])
+        self.chat_queues[chat_id].put_nowait((message, future))
+        
+    async def chat_worker(self, chat_id):
+        """Последовательная отправка сообщений одного чата с учетом лимитов"""
+        queue = self.chat_queues[chat_id]
+        while True:
+            message, future = await queue.get()
+            try:
+                success = await self.deliver(message)
+            except asyncio.CancelledError:
+                if future is not None and not future.done():
+                    future.set_result(False)
+                raise
+            except Exception as e:
+                logging.error(f"❌ Общая ошибка при публикации: {e}")
+                success = False
+            finally:
+                self.queued.discard(message.get('id'))
+                queue.task_done()
+                
+            if future is not None:
+                if not future.done():
+                    future.set_result(success)
+            elif success and self.db:
+                # Досланное после перезапуска сообщение некому отметить опубликованным
+                await self.db.save_post(message['post'], message['content_type'], chat_id)
+                
+    async def close(self):
+        """Остановка очередей чатов; неотправленные сообщения остаются в outbox до следующего запуска"""
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Ожидающим публикации - отказ, а не вечное ожидание
+        for queue in self.chat_queues.values():
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                if future is not None and not future.done():
+                    future.set_result(False)
+        self.workers.clear()
+        self.chat_queues.clear()
+        self.chat_buckets.clear()
+        self.queued.clear()
+        
+    async def deliver(self, message):
+        """Отправка одного сообщения с повторами; RetryAfter задает паузу для всего чата"""
+        chat_bucket = self.chat_buckets[message['chat_id']]
+        attempts = message.get('attempts', 0)
+        
+        while attempts < TELEGRAM_MAX_RETRIES:
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            attempts += 1
+            try:
+                with metrics.timer('telegram_send_seconds', chat=message['chat_id']):
+                    await self.bot.send_message(
+                        chat_id=message['chat_id'],
+                        text=message['text'],
+                        parse_mode='HTML',
+                        disable_web_page_preview=False
+                    )
+                await self.set_status(message, 'sent', attempts)
+                return True
+                
+            except RetryAfter as e:
+                metrics.inc('telegram_errors_total', chat=message['chat_id'], error='RetryAfter')
+                retry_after = e.retry_after
+                if hasattr(retry_after, 'total_seconds'):
+                    retry_after = retry_after.total_seconds()
+                logging.warning(f"⏳ Flood control Telegram, ждем {retry_after} с")
+                chat_bucket.pause(retry_after)
+            except (BadRequest, Forbidden) as e:
+                metrics.inc('telegram_errors_total', chat=message['chat_id'], error=type(e).__name__)
+                # Повтор не поможет: неверная разметка, нет прав в канале и т.п.
+                logging.error(f"❌ Ошибка Telegram при публикации: {e}")
+                break
+            except TelegramError as e:
+                metrics.inc('telegram_errors_total', chat=message['chat_id'], error=type(e).__name__)
+                delay = TELEGRAM_RETRY_BASE_DELAY * 2 ** (attempts - 1) * random.uniform(0.8, 1.2)
+                logging.warning(f"⚠️ Ошибка Telegram при публикации (попытка {attempts}): {e}, повтор через {delay:.1f} с")
+                await self.set_status(message, 'pending', attempts)
+                await asyncio.sleep(delay)
+                
+        await self.set_status(message, 'failed', attempts)
+        return False
+        
+    async def set_status(self, message, status, attempts):
+        if self.db and message.get('id') is not None:
+            await self.db.update_outbox(message['id'], status, attempts)
             
-            await self.bot.send_message(
-                chat_id=self.channel_id,
-                text=message,
-                parse_mode='HTML',
-                disable_web_page_preview=False
-            )
+    async def post_to_channel(self, content, content_type, channel=None):
+        """Публикация поста в канал через очередь отправки; channel - описание из config.CHANNELS"""
+        try:
+            message = {
+                'chat_id': channel['id'] if channel else self.channel_id,
+                'text': self.format_post(content, content_type, channel.get('format') if channel else None),
+                'content_type': content_type,
+                'post': content,
+                'attempts': 0
+            }
+            if self.db:
+                message['id'] = await self.db.add_outbox(
+                    message['chat_id'], message['text'], content_type, content
+                )
+                
+            future = asyncio.get_running_loop().create_future()
+            self.enqueue(message, future)
+            with metrics.timer('post_seconds', chat=message['chat_id']):
+                success = await future
             
-            logging.info(f"✅ Успешно опубликован пост в канал: {content['title'][:50]}...")
-            return True
+            if success:
+                logging.info(f"✅ Успешно опубликован пост в канал: {content['title'][:50]}...")
+            return success
             
-        except TelegramError as e:
-            logging.error(f"❌ Ошибка Telegram при публикации: {e}")
-            return False
         except Exception as e:
             logging.error(f"❌ Общая ошибка при публикации: {e}")
             return False
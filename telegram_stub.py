@@ -0,0 +1,110 @@
+from aiohttp import web
+import asyncio
+import logging
+import random
+import time
+import zlib
+
+# Локальная замена Telegram Bot API для пробных прогонов (python main.py --dry-run):
+# getMe и sendMessage с настраиваемой задержкой, ошибками и ответами 429 (flood control).
+# Бот направляется сюда через base_url, поэтому TelegramPoster работает без изменений
+
+class TelegramStubServer:
+    """Заглушка Bot API на 127.0.0.1; отправленные сообщения сохраняются в self.messages"""
+    
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, jitter=0.5, error_rate=0.0,
+                 flood_rate=0.0, retry_after=1, chat_limit=20):
+        self.host = host
+        self.port = port
+        self.latency = latency  # Задержка ответа, секунд
+        self.jitter = jitter  # Разброс задержки: +-доля от latency
+        self.error_rate = error_rate  # Доля ответов 500
+        self.flood_rate = flood_rate  # Доля случайных ответов 429
+        self.retry_after = retry_after  # retry_after в ответах 429, секунд
+        self.chat_limit = chat_limit  # Сообщений в минуту в один чат до ответа 429 (0 - без лимита)
+        self.runner = None
+        self.messages = []
+        self.responses = {}
+        self.chat_times = {}
+        
+    @property
+    def base_url(self):
+        """base_url для telegram.Bot"""
+        return f"http://{self.host}:{self.port}/bot"
+        
+    def count(self, kind):
+        self.responses[kind] = self.responses.get(kind, 0) + 1
+        
+    def reply(self, status, result=None, description=None, retry_after=None):
+        self.count(status)
+        if status == 200:
+            return web.json_response({'ok': True, 'result': result})
+        body = {'ok': False, 'error_code': status, 'description': description}
+        if retry_after is not None:
+            body['parameters'] = {'retry_after': retry_after}
+        return web.json_response(body, status=status)
+        
+    async def params(self, request):
+        """Параметры метода: форма (python-telegram-bot) или JSON"""
+        if request.content_type == 'application/json':
+            return await request.json()
+        return dict(await request.post())
+        
+    def chat(self, chat_id):
+        if str(chat_id).startswith('@'):
+            return {'id': -1000000000000 - zlib.crc32(chat_id.encode()), 'type': 'channel', 'title': chat_id,
+                    'username': chat_id[1:]}
+        return {'id': int(chat_id), 'type': 'channel', 'title': str(chat_id)}
+        
+    async def handle(self, request):
+        method = request.match_info['method']
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+            
+        if method == 'getMe':
+            return self.reply(200, {'id': 1, 'is_bot': True, 'first_name': 'АвтоИнсайдер (заглушка)',
+                                    'username': 'autoinsider_stub_bot'})
+        if method != 'sendMessage':
+            return self.reply(404, description='Not Found: method not found')
+            
+        params = await self.params(request)
+        if not params.get('chat_id') or not params.get('text'):
+            return self.reply(400, description='Bad Request: chat_id and text are required')
+        if random.random() < self.error_rate:
+            return self.reply(500, description='Internal Server Error')
+        if random.random() < self.flood_rate:
+            return self.reply(429, description=f'Too Many Requests: retry after {self.retry_after}',
+                              retry_after=self.retry_after)
+                              
+        # Лимит канала как у настоящего API: не больше chat_limit сообщений за последнюю минуту
+        now = time.monotonic()
+        times = self.chat_times.setdefault(params['chat_id'], [])
+        times[:] = [sent for sent in times if now - sent < 60]
+        if self.chat_limit and len(times) >= self.chat_limit:
+            retry_after = int(60 - (now - times[0])) + 1
+            return self.reply(429, description=f'Too Many Requests: retry after {retry_after}', retry_after=retry_after)
+        times.append(now)
+        
+        self.messages.append(params)
+        return self.reply(200, {
+            'message_id': len(self.messages),
+            'date': int(time.time()),
+            'chat': self.chat(params['chat_id']),
+            'text': params['text']
+        })
+        
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port, shutdown_timeout=0.1)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        logging.info(f"🧪 Заглушка Telegram Bot API: {self.base_url}")
+        return self
+        
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,77 @@
+"""Живой сбор, когда в пуле кандидатов нечего публиковать"""
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import config
+from database import Database
+from main import AutoInsiderAgent, RecordingPoster
+from synthetic_server import SyntheticServer
+
+def test_live_collection_uses_seen_items(monkeypatch, tmp_path):
+    async def run():
+        server = await SyntheticServer().start()
+        for content_type in config.SOURCES:
+            monkeypatch.setitem(config.SOURCES, content_type, [server.url(0)])
+        monkeypatch.setattr(config, 'SHARED_SOURCES', [])
+        agent = AutoInsiderAgent(Database(str(tmp_path / 'test.db')))
+        agent._poster = RecordingPoster()
+        try:
+            # Предзагрузка отмечает элементы ленты просмотренными, затем снимки устаревают и пул пустеет
+            await agent.prefetch()
+            agent.aggregator.snapshots.clear()
+            await agent.db.run(agent.db.conn.execute, 'DELETE FROM candidate_pool')
+            assert not await agent.db.get_candidates('insurance', config.CHANNEL_ID, 1)
+            
+            await agent.collect_and_post('insurance')
+            return agent.poster.posts, agent.aggregator.seen
+        finally:
+            await agent.aggregator.close()
+            agent.db.close()
+            await server.stop()
+            
+    posts, seen = asyncio.run(run())
+    assert len(posts) == 1
+    _, content_type, post = posts[0]
+    assert content_type == 'insurance'
+    # Опубликован уже просмотренный элемент ленты, а не резервный контент
+    assert post['source'] != 'Резервный источник'
+    assert post['item_key'] in seen
+
+def test_live_collection_when_pool_is_all_duplicates(monkeypatch, tmp_path):
+    published = {
+        'title': 'ЦБ изменил тарифный коридор ОСАГО',
+        'summary': 'Страховые компании сообщили об изменении правил расчета стоимости полиса ОСАГО.',
+        'link': 'https://www.banki.ru/news/1',
+        'source': 'https://www.banki.ru/rss',
+    }
+    
+    async def run():
+        server = await SyntheticServer().start()
+        monkeypatch.setitem(config.SOURCES, 'insurance', [server.url(0)])
+        monkeypatch.setattr(config, 'SHARED_SOURCES', [])
+        agent = AutoInsiderAgent(Database(str(tmp_path / 'test.db')))
+        agent._poster = RecordingPoster()
+        try:
+            # В пуле единственный кандидат - та же новость, что уже опубликована из другого источника
+            await agent.db.save_post(published, 'insurance', config.CHANNEL_ID)
+            await agent.db.add_candidates([dict(published, source='https://www.insur-info.ru/rss')], [1.0],
+                                          'insurance', config.CHANNEL_ID)
+            assert await agent.db.get_candidates('insurance', config.CHANNEL_ID)
+            
+            await agent.collect_and_post('insurance')
+            return agent.poster.posts
+        finally:
+            await agent.aggregator.close()
+            agent.db.close()
+            await server.stop()
+            
+    posts = asyncio.run(run())
+    assert len(posts) == 1
+    _, _, post = posts[0]
+    assert post['title'] != published['title']
+    assert post['source'] != 'Резервный источник'
@@ -0,0 +1,69 @@
+"""Почти-дубликаты: оценка сходства MinHash и отсев по NEAR_DUPLICATE_THRESHOLD"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import NEAR_DUPLICATE_THRESHOLD
+from database import Database
+from similarity import minhash, shingles, similarity
+
+PUBLISHED = {
+    'title': 'ЦБ изменил тарифный коридор ОСАГО',
+    'summary': 'Банк России расширил тарифный коридор ОСАГО: базовая ставка для легковых автомобилей '
+               'теперь может отличаться на десять процентов, страховщики пересчитают полисы с апреля.',
+    'link': 'https://www.banki.ru/news/1',
+    'source': 'https://www.banki.ru/rss',
+}
+# Та же новость из другого источника: другие заголовок и ссылка, почти тот же текст
+RETOLD = {
+    'title': 'Банк России изменил тарифный коридор по ОСАГО',
+    'summary': 'Банк России расширил тарифный коридор ОСАГО: базовая ставка для легковых автомобилей '
+               'может отличаться на десять процентов, страховщики пересчитают полисы с апреля.',
+    'link': 'https://www.insur-info.ru/news/2',
+    'source': 'https://www.insur-info.ru/rss',
+}
+# Продолжение темы: общие слова есть, но сходство ниже порога
+RELATED = {
+    'title': 'Страховщики пересчитают полисы ОСАГО',
+    'summary': 'После решения Банка России о тарифном коридоре страховые компании обновят калькуляторы, '
+               'цены для водителей такси вырастут сильнее всего.',
+    'link': 'https://www.insur-info.ru/news/4',
+    'source': 'https://www.insur-info.ru/rss',
+}
+OTHER = {
+    'title': 'Новые штрафы ГИБДД за парковку',
+    'summary': 'С марта водители заплатят больше за стоянку на газонах и тротуарах в крупных городах.',
+    'link': 'https://www.garant.ru/news/3',
+    'source': 'https://www.garant.ru/rss',
+}
+
+def text(post):
+    return f"{post['title']} {post['summary']}"
+
+def jaccard(first, second):
+    first, second = shingles(first), shingles(second)
+    return len(first & second) / len(first | second)
+
+def test_similarity_estimates_jaccard():
+    for post in (RETOLD, RELATED, OTHER):
+        estimate = similarity(minhash(text(PUBLISHED)), minhash(text(post)))
+        assert abs(estimate - jaccard(text(PUBLISHED), text(post))) < 0.2
+    assert similarity(minhash(text(PUBLISHED)), minhash(text(RETOLD))) >= NEAR_DUPLICATE_THRESHOLD
+    assert similarity(minhash(text(PUBLISHED)), minhash(text(RELATED))) < NEAR_DUPLICATE_THRESHOLD
+
+def test_near_duplicates_of_published_posts_are_filtered(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    
+    async def run():
+        await db.save_post(PUBLISHED, 'insurance', '@channel')
+        unique = await db.filter_near_duplicates([RETOLD, RELATED, OTHER], '@channel')
+        # В другом канале эта новость еще не публиковалась
+        other_channel = await db.filter_near_duplicates([RETOLD, RELATED, OTHER], '@other')
+        return unique, other_channel
+        
+    unique, other_channel = asyncio.run(run())
+    assert [post['title'] for post in unique] == [RELATED['title'], OTHER['title']]
+    assert len(other_channel) == 3
+    db.close()
@@ -0,0 +1,38 @@
+"""Ведро токенов: лимит частоты, запас подряд и пауза RetryAfter"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import TokenBucket
+
+def timed_acquires(bucket, count):
+    """Время каждого из count последовательных acquire() от начала, секунд"""
+    async def run():
+        start = time.monotonic()
+        times = []
+        for _ in range(count):
+            await bucket.acquire()
+            times.append(time.monotonic() - start)
+        return times
+    return asyncio.run(run())
+
+def test_capacity_is_available_at_once():
+    times = timed_acquires(TokenBucket(rate=10, capacity=3), 3)
+    assert times[-1] < 0.05
+
+def test_rate_limits_after_capacity():
+    times = timed_acquires(TokenBucket(rate=20, capacity=1), 5)
+    # Первый токен сразу, остальные - по одному в 1/20 с
+    assert times[0] < 0.02
+    assert times[-1] >= 4 / 20 - 0.01
+
+def test_pause_delays_next_token():
+    bucket = TokenBucket(rate=100, capacity=5)
+    bucket.pause(0.2)
+    # Запас сгорает, токены уходят в минус на 0.2 с выдачи
+    assert bucket.tokens <= -0.2 * 100 + 1e-6
+    times = timed_acquires(bucket, 1)
+    assert times[0] >= 0.2 - 0.01
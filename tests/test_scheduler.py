@@ -0,0 +1,69 @@
+"""Планировщик с расписанием в БД: пропущенные, прерванные и повторно захваченные запуски"""
+import asyncio
+import os
+import sys
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apscheduler.triggers.cron import CronTrigger
+from database import Database
+from scheduler import Scheduler, utcnow
+
+def run_scheduler(db, job_ids, seconds=0.2):
+    """Запуск планировщика с заданиями job_ids на seconds секунд; возвращает выполненные задания"""
+    runs = []
+    
+    async def job(job_id):
+        runs.append(job_id)
+        
+    async def run():
+        scheduler = Scheduler(db, misfire_grace_time=3600)
+        for job_id in job_ids:
+            scheduler.add_job(job, CronTrigger(hour=3), args=[job_id], id=job_id)
+        await scheduler.start()
+        await asyncio.sleep(seconds)
+        await scheduler.shutdown()
+        
+    asyncio.run(run())
+    return runs
+
+def job_runs(db):
+    return {job_id: status for job_id, status in db.conn.execute('SELECT job_id, status FROM job_runs')}
+
+def test_missed_run_within_grace_runs_after_restart(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    now = utcnow()
+    asyncio.run(db.save_job_state('late', now - timedelta(minutes=30), None))
+    asyncio.run(db.save_job_state('too_late', now - timedelta(hours=2), None))
+    
+    assert run_scheduler(db, ['late', 'too_late']) == ['late']
+    assert job_runs(db) == {'late': 'done', 'too_late': 'missed'}
+    db.close()
+
+def test_interrupted_run_is_resumed_once(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    now = utcnow()
+    # Процесс упал во время запусков: время следующего уже сохранено, запуски остались running
+    for job_id, scheduled_at in (('publish', now - timedelta(minutes=5)), ('stale', now - timedelta(hours=2))):
+        asyncio.run(db.save_job_state(job_id, now + timedelta(days=1), scheduled_at))
+        assert asyncio.run(db.claim_job_run(job_id, scheduled_at))
+        
+    assert run_scheduler(db, ['publish', 'stale']) == ['publish']
+    assert job_runs(db) == {'publish': 'done', 'stale': 'interrupted'}
+    # Следующий перезапуск не повторяет ни выполненный, ни устаревший запуск
+    assert run_scheduler(db, ['publish', 'stale']) == []
+    db.close()
+
+def test_claimed_run_is_not_repeated(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    scheduled_at = utcnow() - timedelta(minutes=5)
+    # Запуск выполнен, но процесс упал до сохранения следующего времени
+    asyncio.run(db.save_job_state('publish', scheduled_at, None))
+    assert asyncio.run(db.claim_job_run('publish', scheduled_at))
+    assert not asyncio.run(db.claim_job_run('publish', scheduled_at))
+    asyncio.run(db.finish_job_run('publish', scheduled_at, 'done'))
+    
+    assert run_scheduler(db, ['publish']) == []
+    assert job_runs(db) == {'publish': 'done'}
+    db.close()
@@ -0,0 +1,72 @@
+"""Индекс просмотренных элементов лент: фильтр Блума, отложенная отметка и разбор ленты"""
+import asyncio
+import hashlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import seen_index
+from database import Database
+from feed_parser import parse_feed
+from seen_index import BloomFilter, SeenIndex
+
+def key(value):
+    return hashlib.sha1(str(value).encode('utf-8')).hexdigest()
+
+def feed(count):
+    items = ''.join(f'<item><title>Новость {index}</title><link>https://www.banki.ru/news/{index}</link>'
+                    f'<description>Текст</description></item>' for index in range(count))
+    return f'<?xml version="1.0" encoding="utf-8"?><rss><channel>{items}</channel></rss>'.encode('utf-8')
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1000, 1e-3)
+    for index in range(1000):
+        bloom.add(key(index))
+    assert all(key(index) in bloom for index in range(1000))
+    false_positives = sum(key(f"new-{index}") in bloom for index in range(20000))
+    assert false_positives / 20000 < 5e-3
+
+def test_keys_become_seen_only_after_commit(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    
+    async def run():
+        seen = SeenIndex(db)
+        await seen.load()
+        seen.stage([{'item_key': key(1)}, {'item_key': key(2)}, {'title': 'без ключа'}])
+        assert key(1) not in seen
+        await seen.commit()
+        assert key(1) in seen and key(2) in seen
+        # После перезапуска фильтр строится из БД
+        restarted = SeenIndex(db)
+        await restarted.load()
+        return key(1) in restarted, key(3) in restarted
+        
+    assert asyncio.run(run()) == (True, False)
+    db.close()
+
+def test_overfull_filter_is_rebuilt_larger(monkeypatch, tmp_path):
+    monkeypatch.setattr(seen_index, 'SEEN_BLOOM_CAPACITY', 100)
+    db = Database(str(tmp_path / 'test.db'))
+    
+    async def run():
+        seen = SeenIndex(db)
+        await seen.load()
+        seen.stage([{'item_key': key(index)} for index in range(300)])
+        await seen.commit()
+        return seen.bloom.capacity, all(key(index) in seen for index in range(300))
+        
+    capacity, complete = asyncio.run(run())
+    assert capacity >= 600
+    assert complete
+    db.close()
+
+def test_parser_skips_seen_items_within_limit():
+    url = 'https://www.banki.ru/rss'
+    first = parse_feed(feed(10), url, limit=5)
+    seen = BloomFilter(100, 1e-5)
+    for post in first[:3]:
+        seen.add(post['item_key'])
+    # Просмотренные элементы не возвращаются, но занимают место в лимите
+    posts = parse_feed(feed(10), url, limit=5, seen=seen)
+    assert [post['title'] for post in posts] == ['Новость 3', 'Новость 4']
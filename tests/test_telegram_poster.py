@@ -0,0 +1,95 @@
+"""Очередь отправки TelegramPoster: остановка и outbox"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telegram_poster
+from database import Database
+from telegram_poster import TelegramPoster
+
+POST = {
+    'title': 'КБМ для водителей пересчитают с апреля',
+    'summary': 'Страховые компании сообщили об изменении правил расчета стоимости полиса ОСАГО.',
+    'link': 'https://www.banki.ru/news/1',
+    'source': 'https://www.banki.ru/rss',
+}
+
+class FakeBot:
+    """Bot API без сети: сообщение отправляется за delay секунд"""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.delay)
+        self.sent.append((chat_id, text))
+
+def make_poster(db, delay=0.0):
+    poster = TelegramPoster(db)
+    poster.bot = FakeBot(delay)
+    return poster
+
+def test_close_stops_chat_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(telegram_poster, 'TELEGRAM_CHAT_RATE', 100)
+    db = Database(str(tmp_path / 'test.db'))
+    
+    async def run():
+        poster = make_poster(db, delay=60)
+        posting = asyncio.ensure_future(poster.post_to_channel(POST, 'insurance'))
+        await asyncio.sleep(0.05)
+        workers = list(poster.workers.values())
+        await poster.close()
+        assert all(worker.done() for worker in workers)
+        assert not poster.workers
+        # Ожидающий публикации получает отказ, сообщение остается в outbox
+        assert await asyncio.wait_for(posting, 1) is False
+        return await db.get_pending_outbox()
+        
+    pending = asyncio.run(run())
+    assert [message['post']['title'] for message in pending] == [POST['title']]
+    db.close()
+
+def test_start_skips_messages_already_queued(monkeypatch, tmp_path):
+    monkeypatch.setattr(telegram_poster, 'TELEGRAM_CHAT_RATE', 100)
+    db = Database(str(tmp_path / 'test.db'))
+    
+    async def run():
+        poster = make_poster(db, delay=0.2)
+        # Досылка очереди (быстрый старт) приходится на отправку первого сбора: сообщения еще 'pending'
+        posting = [
+            asyncio.ensure_future(poster.post_to_channel(dict(POST, title=f"{POST['title']} {index}"), 'insurance'))
+            for index in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        assert len(await db.get_pending_outbox()) == 2
+        await poster.start()
+        assert await asyncio.gather(*posting) == [True, True]
+        await asyncio.sleep(0.5)
+        await poster.close()
+        return poster.bot.sent, await db.get_pending_outbox()
+        
+    sent, pending = asyncio.run(run())
+    assert len(sent) == 2
+    assert pending == []
+    db.close()
+
+def test_start_resends_pending_messages(monkeypatch, tmp_path):
+    monkeypatch.setattr(telegram_poster, 'TELEGRAM_CHAT_RATE', 100)
+    db = Database(str(tmp_path / 'test.db'))
+    
+    async def run():
+        # Сообщение осталось в outbox с прошлого запуска
+        await db.add_outbox('@channel', 'текст', 'insurance', POST)
+        poster = make_poster(db)
+        await poster.start()
+        await asyncio.sleep(0.1)
+        await poster.close()
+        return poster.bot.sent, await db.get_pending_outbox()
+        
+    sent, pending = asyncio.run(run())
+    assert sent == [('@channel', 'текст')]
+    assert pending == []
+    db.close()
@@ -0,0 +1,34 @@
+from config import PARSE_POOL, PARSE_WORKERS
+import asyncio
+
+# Пул для разбора HTML/XML и проверки постов, чтобы не занимать event loop.
+# Сетевой ввод-вывод остается в loop, в пул передаются сырые байты, обратно - готовые посты
+_pool = None
+
+def get_pool():
+    """Пул, создаваемый при первом обращении; None в режиме "none" (работа прямо в loop)"""
+    global _pool
+    if _pool is None and PARSE_POOL != 'none':
+        # Импорт здесь: multiprocessing не нужен до первого разбора
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        import multiprocessing
+        if PARSE_POOL == 'process':
+            # spawn вместо fork: в процессе уже работают потоки БД и event loop
+            _pool = ProcessPoolExecutor(PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            _pool = ThreadPoolExecutor(PARSE_WORKERS, thread_name_prefix='parse')
+    return _pool
+
+async def run_in_pool(func, *args):
+    """Выполнить func(*args) в пуле разбора"""
+    pool = get_pool()
+    if pool is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+def shutdown_pool():
+    """Остановка пула при завершении работы"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None